@@ -50,6 +50,11 @@ from hikari_clusters import (
 from .cache import Cache
 from .config import CONFIG, Config
 from .cooldowns import cooldown
+from .core.autostar import INDEX as AUTOSTAR
+from .core.invalidation import BUS as INVALIDATION_BUS
+from .core.starboards import flush_edits
+from .core.votes import BUFFER as VOTE_BUFFER
+from .core.warmup import warm_up
 from .database import Database
 from .tasks import expired_premium, patreon, post_stats
 
@@ -129,6 +134,12 @@ class Bot(crescent.Bot):
         self.cluster.ipc.commands.cmd_kwargs["bot"] = self
         self.cluster.ipc.events.include(BOT_EVENT)
         self.cluster.ipc.events.event_kwargs["bot"] = self
+        INVALIDATION_BUS.register(
+            "cache", lambda _: self.cache.clear_safe(), self.cache.clear_safe
+        )
+        INVALIDATION_BUS.bind(
+            self.cluster.cluster_id, self._send_invalidations
+        )
 
         await self.database.connect(
             migrate=self.cluster.cluster_id == 0,
@@ -137,6 +148,7 @@ class Bot(crescent.Bot):
             user=CONFIG.db_user,
             password=CONFIG.db_password,
         )
+        await AUTOSTAR.load(self.cluster.shard_count, self.cluster.shard_ids)
 
         # tasks
         self._tasks.append(
@@ -155,16 +167,27 @@ class Bot(crescent.Bot):
         await super().start(
             **kwargs, activity=hikari.Activity(name="Mention me for help")
         )
+        self._tasks.append(asyncio.create_task(warm_up(self)))
 
         if self.cluster.cluster_id == 0:
             print("Posting commands...")
             await self._command_handler.register_commands()
 
+    async def _send_invalidations(self, data: dict[str, Any]) -> bool:
+        others = self.cluster.ipc.cluster_uids - {self.cluster.ipc.uid}
+        if not others:
+            return False
+        await self.cluster.ipc.send_event(others, "invalidate", data)
+        return True
+
     async def close(self) -> None:
+        await flush_edits(self)
+        await INVALIDATION_BUS.flush()
         await super().close()
         for t in self._tasks:
             t.cancel()
         await asyncio.gather(*self._tasks, return_exceptions=True)
+        await VOTE_BUFFER.flush()
         await self.database.cleanup()
         self.cluster.logger.info("Cleaned up!")
 
@@ -249,6 +272,19 @@ BOT_EVENT = events.EventGroup()
 async def set_cluster_stats(pl: payload.EVENT, bot: Bot) -> None:
     assert pl.data.data
     bot.bot_stats[pl.author] = pl.data.data["guild_count"]
+    if pl.author != bot.cluster.ipc.uid:
+        # lets clusters notice missed invalidations even when idle
+        INVALIDATION_BUS.receive(
+            pl.data.data["cluster_id"],
+            pl.data.data["invalidation_version"],
+            incarnation=pl.data.data["invalidation_incarnation"],
+        )
+
+
+@BOT_EVENT.add("invalidate")
+async def invalidate(pl: payload.EVENT, bot: Bot) -> None:
+    assert pl.data.data
+    INVALIDATION_BUS.receive(**pl.data.data)
 
 
 SERVER_CMD = commands.CommandGroup()
@@ -31,8 +31,6 @@ from hikari.impl.cache import CacheImpl
 from hikari.impl.config import CacheSettings
 
 from starboard.config import CONFIG
-from starboard.database import Starboard
-from starboard.database.models.override import Override
 from starboard.undefined import UNDEF
 
 if TYPE_CHECKING:
@@ -67,10 +65,8 @@ class Cache(CacheImpl):
         self.__webhooks: LFUCache[int, hikari.ExecutableWebhook] = LFUCache(
             CONFIG.webhook_cache_size
         )
-
-        # db side
-        self.__vote_emojis: LFUCache[int, set[str]] = LFUCache(
-            CONFIG.vote_emoji_cache_size
+        self.__null_webhooks: LFUCache[int, None] = LFUCache(
+            CONFIG.webhook_null_cache_size
         )
 
         if TYPE_CHECKING:
@@ -80,7 +76,7 @@ class Cache(CacheImpl):
         self.__null_messages.clear()
         self.__members.clear()
         self.__webhooks.clear()
-        self.__vote_emojis.clear()
+        self.__null_webhooks.clear()
         self.clear_messages()
         self.clear_dm_channel_ids()
 
@@ -88,32 +84,6 @@ class Cache(CacheImpl):
         self.clear_safe()
         super().clear()
 
-    # vote emojis
-    async def guild_vote_emojis(
-        self, guild: hikari.SnowflakeishOr[hikari.PartialGuild]
-    ) -> set[str]:
-        gid = int(guild)
-        ge: set[str]
-        _ge = self.__vote_emojis.get(gid, None)
-        if _ge is None:
-            sbs = await Starboard.fetch_query().where(guild_id=gid).fetchmany()
-            ovs = await Override.fetch_query().where(guild_id=gid).fetchmany()
-            ge = set()
-            for s in sbs:
-                ge = ge.union(s.upvote_emojis).union(s.downvote_emojis)
-            for ov in ovs:
-                ge = ge.union(ov.overrides.get("upvote_emojis", []))
-                ge = ge.union(ov.overrides.get("downvote_emojis", []))
-
-            self.__vote_emojis[gid] = ge
-            return ge
-        return _ge
-
-    def invalidate_vote_emojis(
-        self, guild: hikari.SnowflakeishOr[hikari.PartialGuild]
-    ) -> None:
-        self.__vote_emojis.pop(int(guild), None)
-
     # webhooks
     async def gof_webhook(
         self, webhook_id: hikari.SnowflakeishOr[hikari.PartialWebhook]
@@ -121,10 +91,13 @@ class Cache(CacheImpl):
         wh_id = int(webhook_id)
         if (c := self.__webhooks.get(wh_id)) is not None:
             return c
+        if wh_id in self.__null_webhooks:
+            return None
 
         try:
             obj = await self._app.rest.fetch_webhook(wh_id)
         except hikari.NotFoundError:
+            self.__null_webhooks[wh_id] = None
             return None
 
         assert isinstance(obj, hikari.ExecutableWebhook)
@@ -132,6 +105,18 @@ class Cache(CacheImpl):
         self.__webhooks[wh_id] = obj
         return obj
 
+    def set_webhook(self, webhook: hikari.ExecutableWebhook) -> None:
+        wh_id = int(webhook.webhook_id)
+        self.__webhooks[wh_id] = webhook
+        self.__null_webhooks.pop(wh_id, None)
+
+    def delete_webhook(
+        self, webhook_id: hikari.SnowflakeishOr[hikari.PartialWebhook]
+    ) -> None:
+        wh_id = int(webhook_id)
+        self.__webhooks.pop(wh_id, None)
+        self.__null_webhooks[wh_id] = None
+
     # members
     async def gof_member(
         self,
@@ -29,6 +29,7 @@ import hikari
 from asyncpg import UniqueViolationError
 
 from starboard.config import CONFIG
+from starboard.core.autostar import invalidate_autostar
 from starboard.database import AutoStarChannel, Guild
 from starboard.exceptions import StarboardError
 from starboard.undefined import UNDEF
@@ -63,7 +64,6 @@ class CreateAutoStar:
     name = crescent.option(str, "The name of the autostar channel")
 
     async def callback(self, ctx: crescent.Context) -> None:
-        bot = cast("Bot", ctx.app)
         assert ctx.guild_id
 
         guild = await Guild.get_or_create(ctx.guild_id)
@@ -89,7 +89,7 @@ class CreateAutoStar:
                 "exists."
             ) from None
 
-        bot.database.asc.add(self.channel.id)
+        invalidate_autostar(ctx.guild_id)
         await ctx.respond(
             f"Created autostar channel '{name}' in <#{self.channel.id}>."
         )
@@ -123,6 +123,7 @@ class DeleteAutoStar:
             return
 
         await asc.delete()
+        invalidate_autostar(ctx.guild_id)
         await msg.edit(
             f"Deleted autostar channel '{asc.name}'.", components=[]
         )
@@ -218,6 +219,7 @@ class RenameAutoStar:
         name = clean_name(self.name)
         asc.name = name
         await asc.save()
+        invalidate_autostar(ctx.guild_id)
 
         await ctx.respond(
             f"Renamed autostar channel '{self.autostar}' to '{name}'."
@@ -272,6 +274,7 @@ class EditAutoStar:
             setattr(asc, k, v)
 
         await asc.save()
+        invalidate_autostar(ctx.guild_id)
         await ctx.respond(f"Updated settings for '{asc.name}'.")
 
 
@@ -302,4 +305,5 @@ class SetEmoji:
 
         asc.emojis = list(emojis)
         await asc.save()
+        invalidate_autostar(ctx.guild_id)
         await ctx.respond("Done.")
@@ -35,7 +35,7 @@ from starboard.cooldowns import cooldown
 from starboard.core.config import get_config
 from starboard.core.embed_message import embed_message
 from starboard.core.emojis import stored_to_emoji
-from starboard.core.leaderboard import get_leaderboard, refresh_xp
+from starboard.core.leaderboard import get_leaderboard, get_rank, refresh_xp
 from starboard.database import Guild, Member, Message, SBMessage, Starboard
 from starboard.exceptions import StarboardError
 from starboard.utils import human_to_seconds, parse_date
@@ -266,8 +266,7 @@ class Rank:
         user = self.user or ctx.user
         is_self = user.id == ctx.user.id
 
-        lb = await get_leaderboard(ctx.guild_id)
-        stats = lb.get(user.id)
+        stats = await get_rank(ctx.guild_id, user.id)
 
         xp: float
         rank: int | None
@@ -8,7 +8,7 @@ import hikari
 
 from starboard.commands._converters import channel_list
 from starboard.config import CONFIG
-from starboard.core.config import StarboardConfig
+from starboard.core.config import StarboardConfig, invalidate_config
 from starboard.database import Guild, Override, Starboard, validate_sb_changes
 from starboard.exceptions import OverrideNotFound, StarboardError
 
@@ -166,6 +166,7 @@ class CreateOverride:
                 f"There is already an override with the name '{name}'."
             ) from None
 
+        invalidate_config(ctx.guild_id)
         await ctx.respond(f"Created override with name '{name}'.")
 
 
@@ -182,6 +183,7 @@ class DeleteOverride:
 
         ov = await Override.from_name(ctx.guild_id, self.name)
         await ov.delete()
+        invalidate_config(ctx.guild_id)
         await ctx.respond(f"Deleted setting override '{self.name}'.")
 
 
@@ -198,6 +200,7 @@ async def _update_override(
     ov.overrides = opt
 
     await ov.save()
+    invalidate_config(guild_id)
 
 
 edit = overrides.sub_group("edit", description="Edit a starboard")
@@ -294,6 +297,7 @@ class ResetOverrideSettings:
                 c += 1
         ov.overrides = ovd
         await ov.save()
+        invalidate_config(ctx.guild_id)
         await ctx.respond(f"Reset {c} settings for override '{ov.name}'.")
 
 
@@ -321,6 +325,7 @@ class RenameOverride:
             raise StarboardError(
                 f"There is already an override with the name '{name}'."
             ) from None
+        invalidate_config(ctx.guild_id)
         await ctx.respond(f"Renamed the override '{self.orig}' to '{name}'.")
 
 
@@ -342,6 +347,7 @@ class SetOverrideChannels:
         ov = await Override.from_name(ctx.guild_id, self.name)
         ov.channel_ids = list(channel_list(self.channels, bot).valid)
         await ov.save()
+        invalidate_config(ctx.guild_id)
         await ctx.respond(f"Updated the channels for override '{self.name}'.")
 
 
@@ -368,6 +374,7 @@ class RemoveOverrideChannels:
             .difference(chlist.invalid)
         )
         await ov.save()
+        invalidate_config(ctx.guild_id)
         await ctx.respond(f"Updated the channels for override '{self.name}'.")
 
 
@@ -391,6 +398,7 @@ class AddOverrideChannels:
             set(ov.channel_ids).union(channel_list(self.channels, bot).valid)
         )
         await ov.save()
+        invalidate_config(ctx.guild_id)
         await ctx.respond(f"Updated the channels for override '{self.name}'.")
 
 
@@ -411,7 +419,6 @@ class SetUpvoteEmojis:
     emojis = crescent.option(str, "A list of emojis to use")
 
     async def callback(self, ctx: crescent.Context) -> None:
-        bot = cast("Bot", ctx.app)
         assert ctx.guild_id
         ov = await Override.from_name(ctx.guild_id, self.override)
         guild = await Guild.fetch(guild_id=ctx.guild_id)
@@ -433,7 +440,7 @@ class SetUpvoteEmojis:
         ov_data["downvote_emojis"] = list(downvote_emojis)
         ov.overrides = ov_data
         await ov.save()
-        bot.cache.invalidate_vote_emojis(ctx.guild_id)
+        invalidate_config(ctx.guild_id)
         await ctx.respond("Done.")
 
 
@@ -449,7 +456,6 @@ class SetDownvoteEmojis:
     emojis = crescent.option(str, "A list of emojis to use")
 
     async def callback(self, ctx: crescent.Context) -> None:
-        bot = cast("Bot", ctx.app)
         assert ctx.guild_id
         ov = await Override.from_name(ctx.guild_id, self.override)
         guild = await Guild.fetch(guild_id=ctx.guild_id)
@@ -471,5 +477,5 @@ class SetDownvoteEmojis:
         ov_data["upvote_emojis"] = list(upvote_emojis)
         ov.overrides = ov_data
         await ov.save()
-        bot.cache.invalidate_vote_emojis(ctx.guild_id)
+        invalidate_config(ctx.guild_id)
         await ctx.respond("Done.")
@@ -31,6 +31,13 @@ from hikari_clusters import callbacks, payload
 
 from starboard.config import CONFIG
 from starboard.constants import MESSAGE_LEN
+from starboard.core.config import CACHE as CONFIG_CACHE
+from starboard.core.config import STATS as CONFIG_STATS
+from starboard.core.invalidation import BUS as INVALIDATION_BUS
+from starboard.core.invalidation import benchmark_fanout
+from starboard.core.leaderboard import recompute_xp
+from starboard.core.metrics import COUNTERS, HISTOGRAMS
+from starboard.core.votes import rebuild_points
 from starboard.database import User
 from starboard.exceptions import StarboardError
 from starboard.stats import post_stats
@@ -145,9 +152,113 @@ class GiveCredits:
     guild=CONFIG.main_guild,
 )
 async def clear_cache(ctx: crescent.Context) -> None:
-    bot = cast("Bot", ctx.app)
-    bot.cache.clear_safe()
-    await ctx.respond("Cleared the cache.", ephemeral=True)
+    INVALIDATION_BUS.publish("cache")
+    await ctx.respond("Cleared the cache on every cluster.", ephemeral=True)
+
+
+@plugin.include
+@owner.child
+@crescent.command(
+    name="rebuild-points",
+    description="Rebuild the stored point counts from votes",
+    guild=CONFIG.main_guild,
+)
+class RebuildPoints:
+    guild = crescent.option(
+        str, "The id of the guild (all guilds by default)", default=None
+    )
+
+    async def callback(self, ctx: crescent.Context) -> None:
+        guild_id: int | None
+        try:
+            guild_id = int(self.guild) if self.guild else None
+        except ValueError:
+            raise StarboardError(f"{self.guild} is not a valid id.") from None
+
+        await ctx.defer(True)
+        fixed = await rebuild_points(guild_id)
+        await ctx.respond(
+            f"Rebuilt point counts. {fixed} message(s) were corrected.",
+            ephemeral=True,
+        )
+
+
+@plugin.include
+@owner.child
+@crescent.command(
+    name="recompute-xp",
+    description="Recompute member XP from the stored votes",
+    guild=CONFIG.main_guild,
+)
+class RecomputeXP:
+    guild = crescent.option(
+        str, "The id of the guild (all guilds by default)", default=None
+    )
+
+    async def callback(self, ctx: crescent.Context) -> None:
+        guild_id: int | None
+        try:
+            guild_id = int(self.guild) if self.guild else None
+        except ValueError:
+            raise StarboardError(f"{self.guild} is not a valid id.") from None
+
+        await ctx.defer(True)
+        updated, took = await recompute_xp(guild_id)
+        await ctx.respond(
+            f"Recomputed XP. {updated} member(s) were updated in "
+            f"{took:.2f}s ({updated / max(took, 0.001):.0f} rows/s).",
+            ephemeral=True,
+        )
+
+
+@plugin.include
+@owner.child
+@crescent.command(
+    name="metrics",
+    description="View the metrics for this cluster",
+    guild=CONFIG.main_guild,
+)
+async def view_metrics(ctx: crescent.Context) -> None:
+    lines = [h.summary() for h in HISTOGRAMS.values()]
+    lines.append(
+        f"config_cache: hits={CONFIG_STATS.hits}, "
+        f"misses={CONFIG_STATS.misses}, "
+        f"hit_rate={CONFIG_STATS.hit_rate:.1%}, "
+        f"size={len(CONFIG_CACHE)}/{CONFIG.config_cache_size}"
+    )
+    lines.extend(f"{k}: {v}" for k, v in sorted(COUNTERS.items()))
+    await ctx.respond(
+        "```\n" + ("\n".join(lines) or "No metrics yet.") + "\n```",
+        ephemeral=True,
+    )
+
+
+@plugin.include
+@owner.child
+@crescent.command(
+    name="bench-invalidation",
+    description="Benchmark invalidation fan-out between simulated clusters",
+    guild=CONFIG.main_guild,
+)
+class BenchInvalidation:
+    clusters = crescent.option(
+        int, "How many clusters to simulate", default=8, min_value=2
+    )
+    rounds = crescent.option(
+        int, "How many batches to send", default=1_000, min_value=1
+    )
+
+    async def callback(self, ctx: crescent.Context) -> None:
+        await ctx.defer(True)
+        took = sorted(await benchmark_fanout(self.clusters, self.rounds))
+        p50 = took[len(took) // 2] * 1_000
+        p99 = took[min(len(took) - 1, len(took) * 99 // 100)] * 1_000
+        await ctx.respond(
+            f"Fan-out to {self.clusters - 1} cluster(s) over {self.rounds} "
+            f"round(s): p50 {p50:.3f}ms, p99 {p99:.3f}ms, max "
+            f"{took[-1] * 1_000:.3f}ms.",
+            ephemeral=True,
+        )
 
 
 @plugin.include
@@ -30,7 +30,7 @@ import hikari
 
 from starboard.commands._converters import disid
 from starboard.config import CONFIG
-from starboard.core.permrole import get_permroles
+from starboard.core.permrole import get_permroles, invalidate_permroles
 from starboard.database import Guild, PermRole, Starboard
 from starboard.database.models.permrole import PermRoleStarboard
 from starboard.exceptions import StarboardError
@@ -122,6 +122,7 @@ class CreatePermRole:
                 f"**{self.role}** is already a PermRole."
             ) from None
 
+        invalidate_permroles(ctx.guild_id)
         await ctx.respond(f"**{self.role}** is now a PermRole.")
 
 
@@ -162,6 +163,8 @@ class DeletePermRole:
         if not ret:
             raise StarboardError(f"**{name}** is not a PermRole.")
 
+        assert ctx.guild_id
+        invalidate_permroles(ctx.guild_id)
         await ctx.respond(f"Deleted PermRole **{name}**.")
 
 
@@ -199,6 +202,7 @@ class EditPermRoleGlobal:
             setattr(pr, k, TRIBOOL[v])
 
         await pr.save()
+        invalidate_permroles(pr.guild_id)
         await ctx.respond(f"Settings for **{self.permrole}** update.")
 
 
@@ -247,4 +251,5 @@ class EditPermRoleStarboard:
             pr.recv_votes = TRIBOOL[self.recv_votes]
 
         await pr.save()
+        invalidate_permroles(ctx.guild_id)
         await ctx.respond(f"Updated **{self.permrole}** for {sb.name}.")
@@ -30,7 +30,8 @@ from apgorm import sql
 from asyncpg import UniqueViolationError
 
 from starboard.config import CONFIG
-from starboard.core.posrole import update_posroles
+from starboard.core.posrole import invalidate_posroles, update_posroles
+from starboard.core.roles import get_progress
 from starboard.database import Guild, PosRole, PosRoleMember, XPRole
 from starboard.exceptions import StarboardError
 
@@ -60,6 +61,11 @@ async def refresh_posroles(ctx: crescent.Context) -> None:
     ret = await update_posroles(cast("Bot", ctx.app), ctx.guild_id)
     if ret:
         msg = "Updated PosRoles."
+    elif (p := get_progress(ctx.guild_id)) is not None:
+        msg = (
+            "Roles are already being updated "
+            f"({p.done + p.failed}/{p.queued} members done)."
+        )
     else:
         msg = (
             "This server cannot refresh PosRoles right now. Please try again "
@@ -166,6 +172,7 @@ class CreatePosRole:
                 "There is already a PosRole with max-members set to "
                 f"{self.members}."
             ) from None
+        invalidate_posroles(ctx.guild_id)
         await ctx.respond(f"**{self.role}** is now a PosRole.")
 
 
@@ -199,6 +206,7 @@ class SetPosRoleMembers:
                 "There is already a PosRole with max-members set to "
                 f"{self.members}."
             ) from None
+        invalidate_posroles(ctx.guild_id)
         await ctx.respond(
             f"Set the maximum members for **{self.posrole}** to "
             f"{self.members}."
@@ -220,6 +228,8 @@ class DeletePosRole:
         if not ret:
             raise StarboardError(f"**{self.posrole}** is not a PosRole.")
 
+        assert ctx.guild_id
+        invalidate_posroles(ctx.guild_id)
         await ctx.respond(f"Deleted PosRole **{self.posrole}**.")
 
 
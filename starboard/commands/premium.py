@@ -28,6 +28,8 @@ import crescent
 import hikari
 
 from starboard.config import CONFIG
+from starboard.core.autostar import invalidate_autostar
+from starboard.core.config import invalidate_config
 from starboard.core.premium import redeem, update_prem_locks
 from starboard.database import AutoStarChannel, Guild, Member, Starboard, User
 from starboard.exceptions import StarboardError
@@ -112,6 +114,7 @@ class MoveAscPremLock:
         asc_to.prem_locked = True
         await asc_from.save()
         await asc_to.save()
+        invalidate_autostar(ctx.guild_id)
 
         await ctx.respond(
             f"Lock moved from '{asc_from.name}' to '{asc_to.name}'."
@@ -153,6 +156,7 @@ class MoveSbPremLock:
         sb_to.prem_locked = True
         await sb_from.save()
         await sb_to.save()
+        invalidate_config(ctx.guild_id)
 
         await ctx.respond(
             f"Lock moved from '{sb_from.name}' to '{sb_to.name}'."
@@ -30,7 +30,8 @@ import hikari
 
 from starboard.commands._converters import any_emoji_list
 from starboard.config import CONFIG
-from starboard.core.config import StarboardConfig
+from starboard.core.config import StarboardConfig, invalidate_config
+from starboard.core.leaderboard import schedule_recompute_xp
 from starboard.database import Guild, Override, Starboard, validate_sb_changes
 from starboard.exceptions import StarboardError
 from starboard.undefined import UNDEF
@@ -157,7 +158,6 @@ class CreateStarboard:
     name = crescent.option(str, "The name of the starboard")
 
     async def callback(self, ctx: crescent.Context) -> None:
-        bot = cast("Bot", ctx.app)
         assert ctx.guild_id
         guild = await Guild.get_or_create(ctx.guild_id)
         ip = guild.premium_end is not None
@@ -181,7 +181,7 @@ class CreateStarboard:
                 f"A starboard with the name '{name}' already exists."
             ) from None
 
-        bot.cache.invalidate_vote_emojis(ctx.guild_id)
+        invalidate_config(ctx.guild_id)
         await ctx.respond(
             f"Created starboard '{name}' in <#{self.channel.id}>."
         )
@@ -199,7 +199,6 @@ class DeleteStarboard:
         assert ctx.guild_id
         starboard = await Starboard.from_name(ctx.guild_id, self.starboard)
 
-        bot = cast("Bot", ctx.app)
         assert ctx.guild_id
         confirm = Confirm(ctx.user.id, danger=True)
         msg = await ctx.respond(
@@ -216,9 +215,12 @@ class DeleteStarboard:
             return
 
         await starboard.delete()
-        bot.cache.invalidate_vote_emojis(ctx.guild_id)
+        invalidate_config(ctx.guild_id)
         await msg.edit(f"Deleted starboard '{starboard.name}'.", components=[])
 
+        # votes on this starboard no longer count towards XP
+        schedule_recompute_xp(ctx.guild_id)
+
 
 @plugin.include
 @starboards.child
@@ -242,6 +244,7 @@ class RenameStarboard:
                 f"A starboard with the name '{name}' already exists."
             ) from None
 
+        invalidate_config(ctx.guild_id)
         await ctx.respond(f"Renamed starboard '{old_name}' to '{name}'.")
 
 
@@ -253,6 +256,7 @@ async def _update_starboard(
     for k, v in params.items():
         setattr(s, k, v)
     await s.save()
+    invalidate_config(guild)
     return s
 
 
@@ -288,11 +292,13 @@ class EditStarboardBehavior(BaseEditStarboardBehavior):
 
     async def callback(self, ctx: crescent.Context) -> None:
         assert ctx.guild_id
-        s = await _update_starboard(
-            ctx.guild_id, self.starboard, self._options()
-        )
+        options = self._options()
+        s = await _update_starboard(ctx.guild_id, self.starboard, options)
         await ctx.respond(f"Settings for '{s.name}' updated.")
 
+        if "xp_multiplier" in options:
+            schedule_recompute_xp(ctx.guild_id)
+
 
 @plugin.include
 @edit.child
@@ -361,7 +367,6 @@ class SetUpvoteEmojis:
     emojis = crescent.option(str, "A list of emojis to use")
 
     async def callback(self, ctx: crescent.Context) -> None:
-        bot = cast("Bot", ctx.app)
         assert ctx.guild_id
         s = await Starboard.from_name(ctx.guild_id, self.starboard)
 
@@ -381,7 +386,7 @@ class SetUpvoteEmojis:
         s.upvote_emojis = list(upvote_emojis)
         s.downvote_emojis = list(downvote_emojis)
         await s.save()
-        bot.cache.invalidate_vote_emojis(ctx.guild_id)
+        invalidate_config(ctx.guild_id)
         await ctx.respond("Done.")
 
 
@@ -397,7 +402,6 @@ class SetDownvoteEmojis:
     emojis = crescent.option(str, "A list of emojis to use")
 
     async def callback(self, ctx: crescent.Context) -> None:
-        bot = cast("Bot", ctx.app)
         assert ctx.guild_id
         s = await Starboard.from_name(ctx.guild_id, self.starboard)
 
@@ -417,5 +421,5 @@ class SetDownvoteEmojis:
         s.upvote_emojis = list(upvote_emojis)
         s.downvote_emojis = list(downvote_emojis)
         await s.save()
-        bot.cache.invalidate_vote_emojis(ctx.guild_id)
+        invalidate_config(ctx.guild_id)
         await ctx.respond("Done.")
@@ -28,7 +28,7 @@ import crescent
 import hikari
 
 from starboard.config import CONFIG
-from starboard.core.xprole import refresh_xpr
+from starboard.core.xprole import invalidate_xproles, refresh_xpr
 from starboard.database import Guild, PosRole, XPRole
 from starboard.exceptions import StarboardError
 
@@ -109,6 +109,7 @@ class AddXPRole:
         await XPRole(
             role_id=self.role.id, guild_id=ctx.guild_id, required=self.xp
         ).create()
+        invalidate_xproles(ctx.guild_id)
         await ctx.respond(f"**{self.role}** is now an XPRole.")
 
 
@@ -134,6 +135,7 @@ class SetXPRoleXP:
 
         xpr.required = self.xp
         await xpr.save()
+        invalidate_xproles(ctx.guild_id)
         await ctx.respond(
             f"Set the required XP for **{self.xprole}** to {self.xp}."
         )
@@ -152,6 +154,8 @@ class DeleteXPRole:
         if not ret:
             raise StarboardError(f"**{self.xprole}** is not an XPRole.")
 
+        assert ctx.guild_id
+        invalidate_xproles(ctx.guild_id)
         await ctx.respond(f"Deleted XPRole **{self.xprole}**.")
 
 
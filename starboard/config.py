@@ -113,11 +113,22 @@ class Config:
     user_xpr_cooldown: tuple[int, int] = (5, 60)
     guild_pr_cooldown: tuple[int, int] = (1, 60 * 5)
 
+    # role updates
+    role_update_concurrency: int = 4
+
     # tasks
     check_expired_premium_delay: int = 60 * 60
     update_patreons_delay: int = 60 * 5
     post_stats_delay: int = 60 * 10
     broadcast_stats_delay: int = 60
+    leaderboard_resync_delay: int = 60 * 10
+
+    # vote buffer
+    vote_buffer_enabled: bool = False
+    vote_buffer_delay: float = 0.5
+    vote_buffer_size: int = 500
+    # failed flushes in a row before a batch of votes is dropped
+    vote_buffer_retries: int = 3
 
     # cache
     dm_channel_cache_size: int = 1_000
@@ -125,7 +136,27 @@ class Config:
     message_cache_size: int = 1_000
     message_null_cache_size: int = 1_000
     webhook_cache_size: int = 1_000
-    vote_emoji_cache_size: int = 1_000
+    webhook_null_cache_size: int = 1_000
+    points_cache_size: int = 1_000
+    config_cache_size: int = 1_000
+    permrole_cache_size: int = 1_000
+    permrole_memo_size: int = 256
+    xprole_cache_size: int = 1_000
+    posrole_cache_size: int = 1_000
+    known_member_cache_size: int = 10_000
+    tracked_filter_bits: int = 2**26
+    tracked_filter_hashes: int = 5
+    orig_message_cache_size: int = 10_000
+    leaderboard_cache_size: int = 100
+    leaderboard_cache_members: int = 10_000
+    premium_cache_size: int = 10_000
+    invalidation_batch_delay: float = 0.1
+    asc_reaction_interval: float = 0.25
+    asc_image_timeout: float = 3
+    refresh_concurrency: int = 4
+    embed_cache_size: int = 1_000
+    embed_cache_ttl: int = 600
+    sent_payload_cache_size: int = 10_000
 
     # botlists & stats
     api_keys: dict[str, str] = field(default_factory=dict)
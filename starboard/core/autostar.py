@@ -23,8 +23,12 @@
 from __future__ import annotations
 
 import asyncio
+import time
+import traceback
+from collections import deque
 from contextlib import suppress
-from typing import TYPE_CHECKING, cast
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable, Union, cast
 
 import hikari
 from pycooldown import FixedCooldown
@@ -32,15 +36,261 @@ from pycooldown import FixedCooldown
 from starboard.config import CONFIG
 from starboard.core.notifications import notify
 from starboard.database import AutoStarChannel
+from starboard.utils import owned
 
 from .emojis import stored_to_emoji
 from .has_image import has_image
+from .invalidation import BUS
+from .metrics import histogram
 
 if TYPE_CHECKING:
     from starboard.bot import Bot
 
 
 COOLDOWN: FixedCooldown[int] = FixedCooldown(*CONFIG.guild_asc_cooldown)
+Emoji = Union[hikari.CustomEmoji, hikari.UnicodeEmoji]
+
+
+class AutoStarConfig:
+    __slots__ = ("asc", "_emojis")
+
+    def __init__(self, asc: AutoStarChannel) -> None:
+        self.asc = asc
+        self._emojis: list[Emoji] | None = None
+
+    def emojis(self, bot: Bot) -> list[Emoji]:
+        if self._emojis is not None:
+            return self._emojis
+
+        parsed = [stored_to_emoji(e, bot) for e in self.asc.emojis]
+        emojis = list(dict.fromkeys(e for e in parsed if e is not None))
+        # custom emojis may not be cached yet, so only keep the result once
+        # every emoji could be resolved
+        if None not in parsed:
+            self._emojis = emojis
+        return emojis
+
+
+class AutoStarIndex:
+    """The unlocked autostar channels of the guilds on this cluster's
+    shards, by channel id."""
+
+    __slots__ = ("channels", "guilds", "shard_count", "shard_ids")
+
+    def __init__(self) -> None:
+        self.channels: dict[int, list[AutoStarConfig]] = {}
+        self.guilds: dict[int, set[int]] = {}
+        self.shard_count = 1
+        self.shard_ids: list[int] = [0]
+
+    def get(self, channel_id: int) -> list[AutoStarConfig] | None:
+        return self.channels.get(channel_id)
+
+    def owns(self, guild_id: int) -> bool:
+        return (guild_id >> 22) % self.shard_count in self.shard_ids
+
+    def set_guild(
+        self, guild_id: int, ascs: Iterable[AutoStarChannel]
+    ) -> None:
+        for channel_id in self.guilds.pop(guild_id, ()):
+            self.channels.pop(channel_id, None)
+
+        channels: dict[int, list[AutoStarConfig]] = {}
+        for asc in ascs:
+            if not asc.prem_locked:
+                channels.setdefault(asc.channel_id, []).append(
+                    AutoStarConfig(asc)
+                )
+        if channels:
+            self.channels.update(channels)
+            self.guilds[guild_id] = set(channels)
+
+    async def load(self, shard_count: int, shard_ids: Iterable[int]) -> None:
+        self.shard_count = shard_count
+        self.shard_ids = list(shard_ids)
+
+        rows = await AutoStarChannel.database.fetchmany(
+            f"SELECT * FROM aschannels WHERE {owned()} AND NOT prem_locked",
+            [self.shard_count, self.shard_ids],
+        )
+        guilds: dict[int, list[AutoStarChannel]] = {}
+        for r in rows:
+            asc = AutoStarChannel._from_raw(**r)
+            guilds.setdefault(asc.guild_id, []).append(asc)
+
+        self.channels.clear()
+        self.guilds.clear()
+        for guild_id, ascs in guilds.items():
+            self.set_guild(guild_id, ascs)
+
+    async def reload(self, guild_id: int) -> None:
+        ascs = (
+            await AutoStarChannel.fetch_query()
+            .where(guild_id=guild_id)
+            .fetchmany()
+        )
+        self.set_guild(guild_id, ascs)
+
+
+INDEX = AutoStarIndex()
+
+
+async def _reload(guild_id: int | None) -> None:
+    try:
+        if guild_id is None:
+            await INDEX.load(INDEX.shard_count, INDEX.shard_ids)
+        else:
+            await INDEX.reload(guild_id)
+    except Exception:
+        traceback.print_exc()
+
+
+def _drop_autostar(guild_ids: set[int]) -> None:
+    # the old entries stay in use until the new ones are loaded
+    for guild_id in guild_ids:
+        if INDEX.owns(guild_id):
+            asyncio.create_task(_reload(guild_id))
+
+
+def _reset_autostar() -> None:
+    asyncio.create_task(_reload(None))
+
+
+BUS.register("autostar", _drop_autostar, _reset_autostar)
+
+
+def invalidate_autostar(guild_id: int) -> None:
+    BUS.publish("autostar", guild_id)
+
+
+@dataclass
+class _PendingImage:
+    bot: Bot
+    message: hikari.Message
+    received: float
+    configs: list[AutoStarConfig]
+    timeout: asyncio.TimerHandle
+
+
+# message_id -> autostar checks waiting for an image to show up
+PENDING_IMAGES: dict[int, _PendingImage] = {}
+
+
+def _wait_for_image(
+    bot: Bot, message: hikari.Message, config: AutoStarConfig, received: float
+) -> None:
+    if (pending := PENDING_IMAGES.get(message.id)) is not None:
+        pending.configs.append(config)
+        return
+
+    timeout = asyncio.get_running_loop().call_later(
+        CONFIG.asc_image_timeout,
+        lambda: asyncio.create_task(_image_timeout(message.id)),
+    )
+    PENDING_IMAGES[message.id] = _PendingImage(
+        bot, message, received, [config], timeout
+    )
+
+
+async def handle_update(event: hikari.GuildMessageUpdateEvent) -> None:
+    pending = PENDING_IMAGES.get(event.message_id)
+    if pending is None or not has_image(event.message):
+        return
+
+    del PENDING_IMAGES[event.message_id]
+    pending.timeout.cancel()
+    for c in pending.configs:
+        await _finish_asc(
+            pending.bot, pending.message, c, pending.received, True
+        )
+
+
+async def _image_timeout(message_id: int) -> None:
+    if (pending := PENDING_IMAGES.pop(message_id, None)) is None:
+        return
+
+    message = await pending.bot.cache.gof_message(
+        pending.message.channel_id, message_id
+    )
+    if message is None:
+        return
+    valid = has_image(message)
+    for c in pending.configs:
+        await _finish_asc(pending.bot, message, c, pending.received, valid)
+
+
+@dataclass
+class _PendingReactions:
+    message: hikari.Message
+    emojis: list[Emoji]
+    received: float
+
+
+class ReactionDispatcher:
+    """Adds autostar reactions without blocking the event handler.
+
+    Reactions share one rate limit bucket per channel, so each channel gets a
+    worker that starts one request every CONFIG.asc_reaction_interval seconds
+    without waiting for the previous one to finish. Requests are started in
+    the order they were queued, so emojis keep their configured order."""
+
+    __slots__ = ("queues", "workers")
+
+    def __init__(self) -> None:
+        self.queues: dict[int, deque[_PendingReactions]] = {}
+        self.workers: dict[int, asyncio.Task] = {}
+
+    def add(
+        self, message: hikari.Message, emojis: list[Emoji], received: float
+    ) -> None:
+        channel_id = message.channel_id
+        self.queues.setdefault(channel_id, deque()).append(
+            _PendingReactions(message, emojis, received)
+        )
+        if channel_id not in self.workers:
+            self.workers[channel_id] = asyncio.create_task(
+                self._worker(channel_id)
+            )
+
+    async def _worker(self, channel_id: int) -> None:
+        loop = asyncio.get_running_loop()
+        next_at = 0.0
+        try:
+            while queue := self.queues.get(channel_id):
+                pending = queue.popleft()
+                requests: list[asyncio.Task] = []
+                for e in pending.emojis:
+                    if (delay := next_at - loop.time()) > 0:
+                        await asyncio.sleep(delay)
+                    next_at = loop.time() + CONFIG.asc_reaction_interval
+                    requests.append(
+                        asyncio.create_task(_react(pending.message, e))
+                    )
+                asyncio.create_task(_record(pending, requests))
+        finally:
+            self.queues.pop(channel_id, None)
+            del self.workers[channel_id]
+
+
+async def _react(message: hikari.Message, emoji: Emoji) -> None:
+    with suppress(
+        hikari.ForbiddenError, hikari.NotFoundError, hikari.BadRequestError
+    ):
+        await message.add_reaction(emoji)
+
+
+async def _record(
+    pending: _PendingReactions, requests: list[asyncio.Task]
+) -> None:
+    for r in await asyncio.gather(*requests, return_exceptions=True):
+        if isinstance(r, BaseException):
+            traceback.print_exception(type(r), r, r.__traceback__)
+    LATENCY.observe(time.perf_counter() - pending.received)
+
+
+DISPATCHER = ReactionDispatcher()
+# from the message being received to its last autostar reaction being added
+LATENCY = histogram("autostar_reactions")
 
 
 async def handle_message(event: hikari.GuildMessageCreateEvent) -> None:
@@ -48,31 +298,23 @@ async def handle_message(event: hikari.GuildMessageCreateEvent) -> None:
 
     if (
         event.message.author.is_bot
-        or event.channel_id not in bot.database.asc
+        or (ascs := INDEX.get(event.channel_id)) is None
         or COOLDOWN.update_ratelimit(event.guild_id)
     ):
         return
 
-    asc = (
-        await AutoStarChannel.fetch_query()
-        .where(channel_id=event.channel_id)
-        .fetchmany()
-    )
-    if not asc:
-        bot.database.asc.discard(event.channel_id)
-        return
-
-    for a in asc:
-        if a.prem_locked:
-            continue
-        await _handle_asc(bot, event.message, a)
+    received = time.perf_counter()
+    for a in ascs:
+        await _handle_asc(bot, event.message, a, received)
 
 
 async def _handle_asc(
-    bot: "Bot", message: hikari.Message, asc: AutoStarChannel
+    bot: "Bot",
+    message: hikari.Message,
+    config: AutoStarConfig,
+    received: float,
 ) -> None:
-    if asc.prem_locked:
-        return
+    asc = config.asc
 
     # validation
     valid: bool = True
@@ -83,12 +325,21 @@ async def _handle_asc(
     elif asc.max_chars is not None and ln > asc.max_chars:
         valid = False
     elif asc.require_image and not has_image(message):
-        await asyncio.sleep(0.5)
-        m = await bot.cache.gof_message(message.channel_id, message.id)
-        if m is None:
-            return
-        valid = has_image(m)
+        # discord often resolves embeds shortly after the message is sent
+        _wait_for_image(bot, message, config, received)
+        return
+
+    await _finish_asc(bot, message, config, received, valid)
 
+
+async def _finish_asc(
+    bot: Bot,
+    message: hikari.Message,
+    config: AutoStarConfig,
+    received: float,
+    valid: bool,
+) -> None:
+    asc = config.asc
     if not valid:
         if asc.delete_invalid:
             with suppress(hikari.ForbiddenError):
@@ -111,12 +362,5 @@ async def _handle_asc(
         return
 
     # react
-    _emojis = {stored_to_emoji(e, bot) for e in asc.emojis}
-    _emojis.discard(None)
-    emojis = cast("set[hikari.CustomEmoji | hikari.UnicodeEmoji]", _emojis)
-
-    for e in emojis:
-        with suppress(
-            hikari.ForbiddenError, hikari.NotFoundError, hikari.BadRequestError
-        ):
-            await message.add_reaction(e)
+    if emojis := config.emojis(bot):
+        DISPATCHER.add(message, emojis, received)
@@ -22,29 +22,76 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any, Iterable
+from dataclasses import dataclass
+from typing import Any, Iterable, List, Tuple
 
 from apgorm import raw, sql
+from cachetools import LFUCache
 
-from starboard.database import Override
+from starboard.config import CONFIG
+from starboard.database import Override, Starboard
 
-if TYPE_CHECKING:
-    from starboard.database import Starboard
+from .invalidation import BUS
+
+SETTINGS = (
+    # General Style
+    "display_emoji",
+    "ping_author",
+    "use_server_profile",
+    "extra_embeds",
+    "use_webhook",
+    # Embed Style
+    "color",
+    "jump_to_message",
+    "attachments_list",
+    "replied_to",
+    # Requirements
+    "required",
+    "required_remove",
+    "upvote_emojis",
+    "downvote_emojis",
+    "self_vote",
+    "allow_bots",
+    "require_image",
+    "older_than",
+    "newer_than",
+    # Behavior
+    "enabled",
+    "autoreact_upvote",
+    "autoreact_downvote",
+    "remove_invalid",
+    "link_deletes",
+    "link_edits",
+    "private",
+    "xp_multiplier",
+    "cooldown_enabled",
+    "cooldown_count",
+    "cooldown_period",
+)
 
 
 class StarboardConfig:
+    __slots__ = ("starboard", "overrides", *SETTINGS)
+
     def __init__(
         self, starboard: Starboard, overrides: Iterable[Override] | None
     ) -> None:
         self.starboard = starboard
-        self.overrides = overrides or []
+        self.overrides = list(overrides or [])
 
-    def __getattr__(self, key: str) -> Any:
+        # resolve every setting once, instead of on each access
+        for key in SETTINGS:
+            setattr(self, key, self._resolve(key))
+
+    def _resolve(self, key: str) -> Any:
         for ov in self.overrides:
             if key in ov.overrides:
                 return ov.overrides[key]
         return getattr(self.starboard, key)
 
+    def __getattr__(self, key: str) -> Any:
+        return self._resolve(key)
+
     # General Style
     display_emoji: str | None
     ping_author: bool
@@ -83,9 +130,135 @@ class StarboardConfig:
     cooldown_period: int
 
 
+Route = Tuple[List[StarboardConfig], List[StarboardConfig]]
+
+
+class GuildConfigs:
+    __slots__ = (
+        "starboards",
+        "overrides",
+        "configs",
+        "routes",
+        "default_routes",
+        "vote_emojis",
+    )
+
+    def __init__(
+        self, starboards: Iterable[Starboard], overrides: Iterable[Override]
+    ) -> None:
+        self.starboards: dict[int, Starboard] = {
+            sb.id: sb for sb in starboards
+        }
+        self.overrides: dict[int, list[tuple[set[int], Override]]] = {}
+        for ov in overrides:
+            self.overrides.setdefault(ov.starboard_id, []).append(
+                (set(ov.channel_ids), ov)
+            )
+        self.configs: dict[tuple[int, int], StarboardConfig] = {}
+
+        # emoji -> (upvote configs, downvote configs), for every channel that
+        # has an override, and for every channel that doesn't
+        self.default_routes: dict[str, Route] = self._build_routes(0)
+        self.routes: dict[int, dict[str, Route]] = {
+            channel_id: self._build_routes(channel_id)
+            for ovs in self.overrides.values()
+            for channel_ids, _ in ovs
+            for channel_id in channel_ids
+        }
+        self.vote_emojis: set[str] = set(self.default_routes)
+        for r in self.routes.values():
+            self.vote_emojis.update(r)
+
+    def route(self, emoji: str, channel_id: int) -> Route:
+        routes = self.routes.get(channel_id, self.default_routes)
+        return routes.get(emoji, ([], []))
+
+    def _build_routes(self, channel_id: int) -> dict[str, Route]:
+        routes: dict[str, Route] = {}
+        for sbid in self.starboards:
+            config = self.get(sbid, channel_id)
+            if not config.enabled:
+                continue
+            for e in config.upvote_emojis:
+                routes.setdefault(e, ([], []))[0].append(config)
+            for e in config.downvote_emojis:
+                if e not in config.upvote_emojis:
+                    routes.setdefault(e, ([], []))[1].append(config)
+        return routes
+
+    def get(self, starboard_id: int, channel_id: int) -> StarboardConfig:
+        key = (starboard_id, channel_id)
+        if (c := self.configs.get(key)) is not None:
+            return c
+
+        config = StarboardConfig(
+            self.starboards[starboard_id],
+            [
+                ov
+                for channel_ids, ov in self.overrides.get(starboard_id, [])
+                if channel_id in channel_ids
+            ],
+        )
+        self.configs[key] = config
+        return config
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / max(self.hits + self.misses, 1)
+
+
+STATS = CacheStats()
+CACHE: LFUCache[int, GuildConfigs] = LFUCache(CONFIG.config_cache_size)
+
+
+async def get_guild_configs(guild_id: int) -> GuildConfigs:
+    if (c := CACHE.get(guild_id)) is not None:
+        STATS.hits += 1
+        return c
+
+    STATS.misses += 1
+    sbs = await Starboard.fetch_query().where(guild_id=guild_id).fetchmany()
+    ovs = (
+        await Override.fetch_query()
+        .where(guild_id=guild_id)
+        .order_by(Override.id)
+        .fetchmany()
+    )
+    configs = GuildConfigs(sbs, ovs)
+    CACHE[guild_id] = configs
+    return configs
+
+
+def _drop_configs(guild_ids: set[int]) -> None:
+    for guild_id in guild_ids:
+        CACHE.pop(guild_id, None)
+
+
+BUS.register("config", _drop_configs, CACHE.clear)
+
+
+def invalidate_config(guild_id: int) -> None:
+    BUS.publish("config", guild_id)
+
+
 async def get_config(sb: Starboard, channel_id: int) -> StarboardConfig:
-    ov = await fetch_overrides(sb.id, channel_id)
-    return StarboardConfig(sb, ov)
+    configs = await get_guild_configs(sb.guild_id)
+    if sb.id not in configs.starboards:
+        # the starboard was created after the cache was built
+        CACHE.pop(sb.guild_id, None)
+        configs = await get_guild_configs(sb.guild_id)
+        if sb.id not in configs.starboards:
+            return StarboardConfig(
+                sb, await fetch_overrides(sb.id, channel_id)
+            )
+
+    return configs.get(sb.id, channel_id)
 
 
 async def fetch_overrides(sb: int, ch: int) -> Iterable[Override]:
@@ -25,8 +25,9 @@ from __future__ import annotations
 import hikari
 
 
-def has_image(message: hikari.Message) -> bool:
-    for attachment in message.attachments:
+def has_image(message: hikari.PartialMessage) -> bool:
+    # fields missing from partial messages are UNDEFINED, which is falsy
+    for attachment in message.attachments or ():
         if attachment.media_type is None:
             continue
 
@@ -35,5 +36,5 @@ def has_image(message: hikari.Message) -> bool:
 
     return any(
         embed.image is not None or embed.thumbnail is not None
-        for embed in message.embeds
+        for embed in message.embeds or ()
     )
@@ -0,0 +1,271 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import asyncio
+import json
+import secrets
+import time
+import traceback
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterable, Iterator
+
+from starboard.config import CONFIG
+
+
+@dataclass
+class _Kind:
+    drop: Callable[[set[int]], None]
+    reset: Callable[[], None]
+
+
+@dataclass
+class _Peer:
+    incarnation: str
+    version: int
+    # a heartbeat announced a version whose batch hasn't arrived yet
+    behind: bool = False
+
+
+class InvalidationBus:
+    """Applies cache invalidations locally and broadcasts them, in batches,
+    to every other cluster.
+
+    Each batch carries the sender's version number, which only advances
+    once a batch was sent, and an id that changes every time the sender
+    starts. If a cluster notices a gap in a sender's versions (for example
+    after reconnecting), it resets every registered cache instead of trying
+    to replay what it missed."""
+
+    __slots__ = (
+        "kinds",
+        "version",
+        "incarnation",
+        "seen",
+        "pending",
+        "cluster",
+        "watchers",
+        "_send",
+    )
+
+    def __init__(self) -> None:
+        self.kinds: dict[str, _Kind] = {}
+        self.version = 0
+        self.incarnation = secrets.token_hex(8)
+        # sender cluster id -> the last version received from it
+        self.seen: dict[int, _Peer] = {}
+        self.pending: dict[str, set[int]] = {}
+        self.cluster: int | None = None
+        # (kind, key) pairs dropped while a watcher was open. A key of None
+        # means the whole kind was reset.
+        self.watchers: list[set[tuple[str, int | None]]] = []
+        # returns False if there was no one to send to
+        self._send: Callable[[dict[str, Any]], Awaitable[bool]] | None = None
+
+    def register(
+        self,
+        kind: str,
+        drop: Callable[[set[int]], None],
+        reset: Callable[[], None],
+    ) -> None:
+        self.kinds[kind] = _Kind(drop, reset)
+
+    def bind(
+        self, cluster: int, send: Callable[[dict[str, Any]], Awaitable[bool]]
+    ) -> None:
+        self.cluster = cluster
+        self._send = send
+
+    @contextmanager
+    def watch(self) -> Iterator[set[tuple[str, int | None]]]:
+        """Records every invalidation made while open, so that data loaded
+        in the meantime can be discarded if it went stale."""
+
+        touched: set[tuple[str, int | None]] = set()
+        self.watchers.append(touched)
+        try:
+            yield touched
+        finally:
+            self.watchers.remove(touched)
+
+    def _drop(self, kind: str, keys: set[int]) -> None:
+        self.kinds[kind].drop(keys)
+        for w in self.watchers:
+            w.update((kind, k) for k in keys)
+
+    def drop(self, kind: str, *keys: int) -> None:
+        """Invalidates keys on this cluster only, for changes that every
+        cluster finds out about by itself (like gateway events)."""
+
+        self._drop(kind, set(keys))
+
+    def publish(self, kind: str, *keys: int) -> None:
+        self._drop(kind, set(keys))
+        if self._send is None:
+            return
+
+        if not self.pending:
+            asyncio.create_task(
+                self._flush_after(CONFIG.invalidation_batch_delay)
+            )
+        self.pending.setdefault(kind, set()).update(keys)
+
+    async def _flush_after(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        try:
+            await self.flush()
+        except Exception:
+            traceback.print_exc()
+            if self.pending:
+                asyncio.create_task(self._flush_after(delay))
+
+    async def flush(self) -> None:
+        if not self.pending or self._send is None:
+            return
+
+        batch, self.pending = self.pending, {}
+        version = self.version + 1
+        try:
+            sent = await self._send(
+                {
+                    "cluster": self.cluster,
+                    "incarnation": self.incarnation,
+                    "version": version,
+                    "batch": {k: list(v) for k, v in batch.items()},
+                }
+            )
+        except Exception:
+            # keep the keys so that the next flush retries them
+            for kind, keys in batch.items():
+                self.pending.setdefault(kind, set()).update(keys)
+            raise
+
+        # with no other clusters there was nothing to miss, so the version
+        # stays put and a cluster that starts later doesn't see a gap.
+        if sent:
+            self.version = version
+
+    def receive(
+        self,
+        cluster: int,
+        version: int,
+        batch: dict[str, list[int]] | None = None,
+        incarnation: str = "",
+    ) -> None:
+        """Handles a batch, or a heartbeat if batch is None."""
+
+        peer = self.seen.get(cluster)
+        if peer is None:
+            # nothing was cached from before we could hear from it
+            peer = _Peer(
+                incarnation, version if batch is None else version - 1
+            )
+            self.seen[cluster] = peer
+        elif peer.incarnation != incarnation:
+            # it restarted, and counts from 0 again
+            peer = _Peer(incarnation, 0)
+            self.seen[cluster] = peer
+
+        if batch is None:
+            if version <= peer.version:
+                peer.behind = False
+            elif version == peer.version + 1 and not peer.behind:
+                # the batch can still be on its way; if it is lost, the next
+                # heartbeat will notice.
+                peer.behind = True
+            else:
+                peer.version = version
+                peer.behind = False
+                self.reset()
+            return
+
+        if version > peer.version + 1:
+            self.reset()
+        if version > peer.version:
+            peer.version = version
+            peer.behind = False
+        for kind, keys in batch.items():
+            if kind in self.kinds:
+                self._drop(kind, set(keys))
+
+    def reset(self) -> None:
+        for kind, k in self.kinds.items():
+            k.reset()
+            for w in self.watchers:
+                w.add((kind, None))
+
+
+BUS = InvalidationBus()
+
+
+async def benchmark_fanout(
+    clusters: int, rounds: int, keys: int = 10
+) -> list[float]:
+    """Measures how long a batch takes to reach every other cluster, using
+    in-process buses connected by a JSON round-trip instead of a websocket.
+
+    Returns the latency of each round in seconds."""
+
+    buses = [InvalidationBus() for _ in range(clusters)]
+    remaining = 0
+    done = asyncio.Event()
+
+    def _drop(_: Iterable[int]) -> None:
+        nonlocal remaining
+        remaining -= 1
+        if remaining == 0:
+            done.set()
+
+    def _sender(
+        origin: InvalidationBus,
+    ) -> Callable[[dict[str, Any]], Awaitable[bool]]:
+        async def send(data: dict[str, Any]) -> bool:
+            raw = json.dumps(data)
+            for bus in buses:
+                if bus is not origin:
+                    asyncio.get_running_loop().call_soon(
+                        lambda b=bus: b.receive(**json.loads(raw))
+                    )
+            return True
+
+        return send
+
+    for x, bus in enumerate(buses):
+        bus.register("bench", _drop, lambda: None)
+        bus.bind(x, _sender(bus))
+
+    latencies: list[float] = []
+    for r in range(rounds):
+        origin = buses[r % clusters]
+        remaining = clusters - 1
+        done.clear()
+
+        start = time.perf_counter()
+        origin.pending["bench"] = set(range(keys))
+        await origin.flush()
+        if remaining:
+            await done.wait()
+        latencies.append(time.perf_counter() - start)
+
+    return latencies
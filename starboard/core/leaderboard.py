@@ -22,8 +22,14 @@
 
 from __future__ import annotations
 
+import asyncio
+import time
+import traceback
+from bisect import bisect_left, insort
 from dataclasses import dataclass
 
+from asyncpg import LockNotAvailableError
+from cachetools import LFUCache
 from pycooldown import FixedCooldown
 
 from starboard.config import CONFIG
@@ -52,6 +58,7 @@ async def refresh_xp(guild_id: int, user_id: int) -> bool | None:
         ]
     )
     await member.save()
+    update_leaderboard(guild_id, user_id, member.xp)
     return True
 
 
@@ -65,21 +72,224 @@ async def _count_votes(starboard: Starboard, user_id: int) -> int:
     return upvotes - downvotes
 
 
+async def recompute_xp(guild_id: int | None = None) -> tuple[int, float]:
+    """Rewrites members.xp from the votes table, one guild at a time.
+
+    Returns the number of members that were updated and how long it took.
+    """
+
+    start = time.perf_counter()
+    if guild_id is not None:
+        guild_ids = [guild_id]
+    else:
+        guild_ids = [
+            int(r["guild_id"])
+            for r in await Member.database.fetchmany(
+                "SELECT DISTINCT guild_id FROM members", []
+            )
+        ]
+
+    query = """
+    WITH totals AS (
+        SELECT votes.target_author_id AS user_id, SUM(
+            starboards.xp_multiplier
+            * CASE WHEN votes.is_downvote THEN -1 ELSE 1 END
+        ) AS xp
+        FROM votes
+            JOIN starboards ON starboards.id=votes.starboard_id
+            WHERE starboards.guild_id=$1
+        GROUP BY votes.target_author_id
+    ), fixed AS (
+        UPDATE members SET xp=COALESCE(totals.xp, 0)
+        FROM members AS m
+            LEFT JOIN totals ON totals.user_id=m.user_id
+            WHERE m.guild_id=$1
+            AND members.guild_id=$1
+            AND members.user_id=m.user_id
+            AND members.xp <> COALESCE(totals.xp, 0)
+        RETURNING 1
+    )
+    SELECT COUNT(*) FROM fixed
+    """
+
+    updated = 0
+    for gid in guild_ids:
+        updated += await _recompute_guild(query, gid)
+        LEADERBOARDS.pop(gid, None)
+
+    return updated, time.perf_counter() - start
+
+
+async def _recompute_guild(
+    query: str, guild_id: int, attempts: int = 5
+) -> int:
+    # votes add to members.xp in the same transaction that writes them, so
+    # holding the guild's member rows makes any vote that commits during the
+    # recompute apply its change on top of the new total instead of being
+    # overwritten by it. the short lock_timeout keeps us from deadlocking
+    # with a vote flush; we back off and try again instead.
+    assert Member.database.pool
+    for attempt in range(attempts):
+        try:
+            async with Member.database.pool.acquire() as con:
+                async with con.transaction():
+                    await con.execute("SET LOCAL lock_timeout = '500ms'", [])
+                    await con.execute(
+                        "SELECT 1 FROM members WHERE guild_id=$1 "
+                        "ORDER BY user_id FOR UPDATE",
+                        [guild_id],
+                    )
+                    return int(await con.fetchval(query, [guild_id]))
+        except LockNotAvailableError:
+            if attempt == attempts - 1:
+                raise
+            await asyncio.sleep(attempt + 1)
+
+    raise AssertionError("unreachable")
+
+
+RECOMPUTES: set[asyncio.Task] = set()
+
+
+def schedule_recompute_xp(guild_id: int) -> None:
+    task = asyncio.create_task(_recompute_xp(guild_id))
+    RECOMPUTES.add(task)
+    task.add_done_callback(RECOMPUTES.discard)
+
+
+async def _recompute_xp(guild_id: int) -> None:
+    try:
+        await recompute_xp(guild_id)
+    except Exception:
+        traceback.print_exc()
+
+
+class GuildLeaderboard:
+    __slots__ = ("entries", "xp", "complete", "loaded_at")
+
+    def __init__(self, members: list[tuple[int, float]], complete: bool):
+        # (-xp, user_id), so that the highest xp comes first. if the guild
+        # has more members than were loaded, this is an exact prefix of the
+        # full leaderboard.
+        self.entries = sorted((-xp, uid) for uid, xp in members)
+        self.xp = dict(members)
+        self.complete = complete
+        self.loaded_at = time.monotonic()
+
+    def update(self, user_id: int, xp: float) -> None:
+        if (old := self.xp.pop(user_id, None)) is not None:
+            del self.entries[bisect_left(self.entries, (-old, user_id))]
+
+        if xp <= 0:
+            return
+        key = (-xp, user_id)
+        if not self.complete and (not self.entries or key > self.entries[-1]):
+            # below the cutoff, so we don't know where they belong
+            return
+        insort(self.entries, key)
+        self.xp[user_id] = xp
+
+    def top(self, limit: int, offset: int = 0) -> list[tuple[int, float]]:
+        return [
+            (uid, -nxp) for nxp, uid in self.entries[offset : offset + limit]
+        ]
+
+    def has(self, stop: int) -> bool:
+        return self.complete or stop <= len(self.entries)
+
+    def rank(self, user_id: int) -> int | None:
+        if (xp := self.xp.get(user_id)) is None:
+            return None
+        return bisect_left(self.entries, (-xp, user_id)) + 1
+
+
+LEADERBOARDS: LFUCache[int, GuildLeaderboard] = LFUCache(
+    CONFIG.leaderboard_cache_size
+)
+
+
+# ties are broken by user_id, matching GuildLeaderboard and get_rank
+LEADERBOARD_QUERY = """
+SELECT user_id, xp FROM members
+    WHERE guild_id=$1
+    AND xp > 0
+ORDER BY xp DESC, user_id ASC
+LIMIT $2 OFFSET $3
+"""
+
+
+async def _get_guild_leaderboard(guild_id: int) -> GuildLeaderboard:
+    lb = LEADERBOARDS.get(guild_id)
+    if (
+        lb is not None
+        and time.monotonic() - lb.loaded_at < CONFIG.leaderboard_resync_delay
+    ):
+        return lb
+
+    ret = await Member.database.fetchmany(
+        LEADERBOARD_QUERY, [guild_id, CONFIG.leaderboard_cache_members, 0]
+    )
+
+    lb = GuildLeaderboard(
+        [(int(m["user_id"]), m["xp"]) for m in ret],
+        len(ret) < CONFIG.leaderboard_cache_members,
+    )
+    LEADERBOARDS[guild_id] = lb
+    return lb
+
+
+def update_leaderboard(guild_id: int, user_id: int, xp: float) -> None:
+    if (lb := LEADERBOARDS.get(guild_id)) is not None:
+        lb.update(user_id, xp)
+
+
 async def get_leaderboard(
-    guild_id: int, limit: int = CONFIG.leaderboard_length
+    guild_id: int, limit: int = CONFIG.leaderboard_length, offset: int = 0
 ) -> dict[int, MemberStats]:
-    q = Member.fetch_query()
-    q.where(guild_id=guild_id)
-    q.where(Member.xp.gt(0))
-    q.order_by(Member.xp, reverse=True)
-    ret = await q.fetchmany(limit=limit)
+    lb = await _get_guild_leaderboard(guild_id)
+    if lb.has(offset + limit):
+        return {
+            uid: MemberStats(round(xp, 2), offset + x + 1)
+            for x, (uid, xp) in enumerate(lb.top(limit, offset))
+        }
+
+    ret = await Member.database.fetchmany(
+        LEADERBOARD_QUERY, [guild_id, limit, offset]
+    )
 
     return {
-        m.user_id: MemberStats(round(m.xp, 2), x + 1)
+        int(m["user_id"]): MemberStats(round(m["xp"], 2), offset + x + 1)
         for x, m in enumerate(ret)
     }
 
 
+async def get_rank(guild_id: int, user_id: int) -> MemberStats | None:
+    lb = await _get_guild_leaderboard(guild_id)
+    if (rank := lb.rank(user_id)) is not None:
+        return MemberStats(round(lb.xp[user_id], 2), rank)
+    if lb.complete:
+        return None
+
+    query = """
+    SELECT xp, (
+        SELECT COUNT(*) FROM members AS m
+            WHERE m.guild_id=$1
+            AND (
+                m.xp > members.xp
+                OR (m.xp = members.xp AND m.user_id < members.user_id)
+            )
+    ) AS above
+    FROM members
+        WHERE guild_id=$1
+        AND user_id=$2
+        AND xp > 0
+    """
+    row = await Member.database.fetchrow(query, [guild_id, user_id])
+    if row is None:
+        return None
+    return MemberStats(round(row["xp"], 2), row["above"] + 1)
+
+
 @dataclass
 class MemberStats:
     xp: float
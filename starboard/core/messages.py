@@ -22,11 +22,17 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import asyncio
+import json
+from datetime import datetime
+from typing import TYPE_CHECKING, Any
 
 import hikari
+from cachetools import LRUCache, TTLCache
 
+from starboard.config import CONFIG
 from starboard.database import Message, SBMessage
+from starboard.database.models.message import TRACKED
 
 from .embed_message import embed_message, get_raw_message_text
 from .emojis import stored_to_emoji
@@ -36,16 +42,84 @@ if TYPE_CHECKING:
     from starboard.core.config import StarboardConfig
 
 
+# sb_message_id -> message_id
+SB_MESSAGES: LRUCache[int, int] = LRUCache(CONFIG.orig_message_cache_size)
+# message_id -> Message, shared so that saves are seen by every holder
+MESSAGES: LRUCache[int, Message] = LRUCache(CONFIG.orig_message_cache_size)
+
+
+def track_sb_message(sb_message_id: int, message_id: int) -> None:
+    TRACKED.add(sb_message_id)
+    SB_MESSAGES[sb_message_id] = message_id
+
+
 async def get_orig_message(message_id: int) -> Message | None:
-    if sbm := await SBMessage.exists(sb_message_id=message_id):
-        return await Message.fetch(message_id=sbm.message_id)
+    if message_id not in TRACKED:
+        return None
+    if (m := MESSAGES.get(message_id)) is not None:
+        return m
+
+    if (orig_id := SB_MESSAGES.get(message_id)) is None:
+        if sbm := await SBMessage.exists(sb_message_id=message_id):
+            orig_id = SB_MESSAGES[message_id] = sbm.message_id
+
+    if orig_id is not None:
+        if (m := MESSAGES.get(orig_id)) is None:
+            m = MESSAGES[orig_id] = await Message.fetch(message_id=orig_id)
+        return m
 
     if m := await Message.exists(message_id=message_id):
+        MESSAGES[message_id] = m
         return m
 
     return None
 
 
+# (message_id, edited_timestamp, attachments and embeds, style) -> (embed,
+# extra embeds)
+EMBEDS: TTLCache[
+    tuple[int, datetime | None, int, tuple[Any, ...]],
+    tuple[hikari.Embed, list[hikari.Embed]],
+] = TTLCache(CONFIG.embed_cache_size, CONFIG.embed_cache_ttl)
+# renders that are still running, so that starboards refreshed at the same
+# time with the same style share one
+RENDERS: dict[
+    tuple[int, datetime | None, int, tuple[Any, ...]],
+    asyncio.Future[tuple[hikari.Embed, list[hikari.Embed]]],
+] = {}
+
+
+def _media(bot: Bot, message: hikari.Message) -> int:
+    # Discord adds link embeds and images without changing the edited
+    # timestamp, so they have to be part of the key
+    return hash(
+        (
+            tuple(a.id for a in message.attachments),
+            json.dumps(
+                [
+                    bot.entity_factory.serialize_embed(e)[0]
+                    for e in message.embeds
+                ],
+                sort_keys=True,
+            ),
+        )
+    )
+
+
+def _style(config: StarboardConfig, premium: bool) -> tuple[Any, ...]:
+    # every setting that affects the embeds, but not the plain-text content
+    return (
+        config.color,
+        config.use_server_profile,
+        config.extra_embeds,
+        config.attachments_list,
+        config.jump_to_message,
+        config.replied_to,
+        config.link_edits,
+        premium,
+    )
+
+
 async def get_sbmsg_content(
     bot: Bot,
     config: StarboardConfig,
@@ -53,7 +127,13 @@ async def get_sbmsg_content(
     sql_orig_msg: Message,
     points: int,
     premium: bool,
+    only_changed: bool = False,
 ) -> tuple[str, hikari.Embed | None, list[hikari.Embed]]:
+    """Returns the content and embeds for a starboard message.
+
+    If only_changed is True and the embeds are the same as when they were
+    last rendered, no embeds are returned."""
+
     def _display_emoji() -> hikari.UnicodeEmoji | hikari.CustomEmoji | None:
         return (
             stored_to_emoji(config.display_emoji, bot)
@@ -64,29 +144,8 @@ async def get_sbmsg_content(
     frozen = sql_orig_msg.frozen
     forced = config.starboard.id in sql_orig_msg.forced_to
 
-    if dis_orig_msg is not None:
-        c, e, es = await embed_message(
-            bot=bot,
-            message=dis_orig_msg,
-            guild_id=config.starboard.guild_id,
-            color=config.color,
-            display_emoji=_display_emoji(),
-            server_profile=config.use_server_profile,
-            ping_author=config.ping_author,
-            point_count=points,
-            frozen=frozen,
-            forced=forced,
-            gifs=premium,
-            attachments_list=config.attachments_list,
-            jump_to_message=config.jump_to_message,
-            replied_to=config.replied_to,
-        )
-        if config.extra_embeds:
-            return c, e, es
-        return c, e, []
-
-    return (
-        get_raw_message_text(
+    def _content() -> str:
+        return get_raw_message_text(
             sql_orig_msg.channel_id,
             sql_orig_msg.author_id,
             _display_emoji(),
@@ -94,7 +153,51 @@ async def get_sbmsg_content(
             points,
             frozen,
             forced,
-        ),
-        None,
-        [],
+        )
+
+    if dis_orig_msg is not None:
+        key = (
+            dis_orig_msg.id,
+            dis_orig_msg.edited_timestamp,
+            _media(bot, dis_orig_msg),
+            _style(config, premium),
+        )
+        if (cached := EMBEDS.get(key)) is not None and only_changed:
+            return _content(), None, []
+        if cached is None:
+            if (render := RENDERS.get(key)) is None:
+                render = RENDERS[key] = asyncio.ensure_future(
+                    _render(bot, config, dis_orig_msg, premium)
+                )
+                render.add_done_callback(lambda _: RENDERS.pop(key, None))
+            cached = EMBEDS[key] = await asyncio.shield(render)
+        return _content(), *cached
+
+    return _content(), None, []
+
+
+async def _render(
+    bot: Bot,
+    config: StarboardConfig,
+    dis_orig_msg: hikari.Message,
+    premium: bool,
+) -> tuple[hikari.Embed, list[hikari.Embed]]:
+    # only the embeds are kept. the plain-text content depends on more than
+    # the style (like the point count), so get_sbmsg_content builds it.
+    _, e, es = await embed_message(
+        bot=bot,
+        message=dis_orig_msg,
+        guild_id=config.starboard.guild_id,
+        color=config.color,
+        display_emoji=None,
+        server_profile=config.use_server_profile,
+        ping_author=False,
+        point_count=0,
+        frozen=False,
+        forced=False,
+        gifs=premium,
+        attachments_list=config.attachments_list,
+        jump_to_message=config.jump_to_message,
+        replied_to=config.replied_to,
     )
+    return e, es if config.extra_embeds else []
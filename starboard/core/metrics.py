@@ -0,0 +1,92 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Counter
+
+# upper bounds of the histogram buckets, in milliseconds
+BOUNDS: tuple[float, ...] = (
+    5,
+    10,
+    25,
+    50,
+    100,
+    250,
+    500,
+    1_000,
+    2_500,
+    5_000,
+    10_000,
+)
+
+
+class Histogram:
+    __slots__ = ("name", "counts", "total", "max")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        # the last bucket holds everything above the highest bound
+        self.counts = [0] * (len(BOUNDS) + 1)
+        self.total = 0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1_000
+        self.counts[bisect_left(BOUNDS, ms)] += 1
+        self.total += 1
+        self.max = max(self.max, ms)
+
+    def percentile(self, q: float) -> float:
+        """The upper bound, in milliseconds, of the bucket holding the q-th
+        percentile."""
+
+        if not self.total:
+            return 0.0
+        target = self.total * q / 100
+        seen = 0
+        for x, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return BOUNDS[x] if x < len(BOUNDS) else self.max
+        return self.max
+
+    def summary(self) -> str:
+        return (
+            f"{self.name}: n={self.total}, p50<={self.percentile(50):.0f}ms, "
+            f"p99<={self.percentile(99):.0f}ms, max={self.max:.0f}ms"
+        )
+
+
+HISTOGRAMS: dict[str, Histogram] = {}
+COUNTERS: Counter[str] = Counter()
+
+
+def histogram(name: str) -> Histogram:
+    if (h := HISTOGRAMS.get(name)) is None:
+        h = HISTOGRAMS[name] = Histogram(name)
+    return h
+
+
+def count(name: str, n: int = 1) -> None:
+    COUNTERS[name] += n
@@ -23,12 +23,16 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Iterable
+from typing import Any, Iterable, Mapping
 
 import hikari
+from cachetools import LFUCache
 
+from starboard.config import CONFIG
 from starboard.database import PermRole, PermRoleStarboard
 
+from .invalidation import BUS
+
 
 @dataclass
 class Permissions:
@@ -47,24 +51,148 @@ class PermRoleConfig:
         }
 
 
-async def get_permroles(guild: hikari.Guild) -> list[PermRoleConfig]:
-    configs: list[PermRoleConfig] = []
-    pr = await PermRole.fetch_query().where(guild_id=guild.id).fetchmany()
-    pr_ids: set[int] = set()
-    for r in pr:
-        pr_ids.add(r.role_id)
-        sr = (
-            await PermRoleStarboard.fetch_query()
-            .where(permrole_id=r.role_id)
-            .fetchmany()
-        )
-        configs.append(PermRoleConfig(r, sr))
+class GuildPermRoles:
+    __slots__ = ("permroles", "role_ids", "memo")
 
-    role_indices: dict[int, int] = {
-        r.id: r.position for r in guild.get_roles().values() if r.id in pr_ids
+    def __init__(self, permroles: list[PermRoleConfig]) -> None:
+        # ordered from the lowest role to the highest
+        self.permroles = permroles
+        self.role_ids = frozenset(c.permrole.role_id for c in permroles)
+        self.memo: LFUCache[
+            tuple[tuple[int, ...], int | None], Permissions
+        ] = LFUCache(CONFIG.permrole_memo_size)
+
+    def get(
+        self, role_ids: Iterable[int], starboard_id: int | None
+    ) -> Permissions:
+        key = (
+            tuple(sorted(self.role_ids.intersection(role_ids))),
+            starboard_id,
+        )
+        if (c := self.memo.get(key)) is not None:
+            return c
+
+        perms = Permissions()
+        matched = set(key[0])
+        for role in self.permroles:
+            if role.permrole.role_id not in matched:
+                continue
+
+            if role.permrole.vote is not None:
+                perms.vote = role.permrole.vote
+            if role.permrole.recv_votes is not None:
+                perms.recv_votes = role.permrole.recv_votes
+            if role.permrole.xproles is not None:
+                perms.xproles = role.permrole.xproles
+
+            if starboard_id in role.starboards and starboard_id is not None:
+                sbperms = role.starboards[starboard_id]
+                if sbperms.vote is not None:
+                    perms.vote = sbperms.vote
+                if sbperms.recv_votes is not None:
+                    perms.recv_votes = sbperms.recv_votes
+
+        self.memo[key] = perms
+        return perms
+
+
+CACHE: LFUCache[int, GuildPermRoles] = LFUCache(CONFIG.permrole_cache_size)
+# permroles loaded before their guild was available to sort them by position
+PREFETCHED: LFUCache[int, list[PermRoleConfig]] = LFUCache(
+    CONFIG.permrole_cache_size
+)
+
+PERMROLE_QUERY = (
+    "SELECT permroles.*, permrole_starboards.starboard_id AS sb_id, "
+    "permrole_starboards.vote AS sb_vote, "
+    "permrole_starboards.recv_votes AS sb_recv_votes "
+    "FROM permroles LEFT JOIN permrole_starboards "
+    "ON permrole_starboards.permrole_id=permroles.role_id "
+)
+
+
+async def get_guild_permroles(guild: hikari.Guild) -> GuildPermRoles:
+    if (c := CACHE.get(guild.id)) is not None:
+        return c
+
+    if (configs := PREFETCHED.pop(guild.id, None)) is None:
+        rows = await PermRole.database.fetchmany(
+            PERMROLE_QUERY + "WHERE permroles.guild_id=$1", [guild.id]
+        )
+        configs = list(build_permroles(rows).values())
+
+    roles = guild.get_roles()
+    configs.sort(
+        key=lambda c: (
+            role.position
+            if (role := roles.get(hikari.Snowflake(c.permrole.role_id)))
+            else -1
+        )
+    )
+
+    compiled = GuildPermRoles(configs)
+    CACHE[guild.id] = compiled
+    return compiled
+
+
+def build_permroles(
+    rows: Iterable[Mapping[str, Any]]
+) -> dict[int, PermRoleConfig]:
+    """Builds the (unsorted) permroles from rows of PERMROLE_QUERY."""
+
+    permroles: dict[int, PermRole] = {}
+    starboard_perms: dict[int, list[PermRoleStarboard]] = {}
+    for r in rows:
+        role_id = int(r["role_id"])
+        if role_id not in permroles:
+            permroles[role_id] = PermRole._from_raw(
+                role_id=r["role_id"],
+                guild_id=r["guild_id"],
+                xproles=r["xproles"],
+                vote=r["vote"],
+                recv_votes=r["recv_votes"],
+            )
+            starboard_perms[role_id] = []
+        if r["sb_id"] is not None:
+            starboard_perms[role_id].append(
+                PermRoleStarboard._from_raw(
+                    permrole_id=r["role_id"],
+                    starboard_id=r["sb_id"],
+                    vote=r["sb_vote"],
+                    recv_votes=r["sb_recv_votes"],
+                )
+            )
+
+    return {
+        role_id: PermRoleConfig(pr, starboard_perms[role_id])
+        for role_id, pr in permroles.items()
     }
-    configs.sort(key=lambda c: role_indices.get(c.permrole.role_id, -1))
-    return configs
+
+
+def _drop_permroles(guild_ids: set[int]) -> None:
+    for guild_id in guild_ids:
+        CACHE.pop(guild_id, None)
+        PREFETCHED.pop(guild_id, None)
+
+
+def _reset_permroles() -> None:
+    CACHE.clear()
+    PREFETCHED.clear()
+
+
+BUS.register("permroles", _drop_permroles, _reset_permroles)
+
+
+def invalidate_permroles(guild_id: int) -> None:
+    BUS.publish("permroles", guild_id)
+
+
+def drop_permroles(guild_id: int) -> None:
+    BUS.drop("permroles", guild_id)
+
+
+async def get_permroles(guild: hikari.Guild) -> list[PermRoleConfig]:
+    return (await get_guild_permroles(guild)).permroles
 
 
 async def get_permissions(
@@ -72,27 +200,6 @@ async def get_permissions(
     role_ids: set[int] | None = None,
     starboard_id: int | None = None,
 ) -> Permissions:
-    role_ids = role_ids or set()
-
-    permroles = await get_permroles(guild)
-    perms = Permissions()
-
-    for role in permroles:
-        if role.permrole.role_id not in role_ids:
-            continue
-
-        if role.permrole.vote is not None:
-            perms.vote = role.permrole.vote
-        if role.permrole.recv_votes is not None:
-            perms.recv_votes = role.permrole.recv_votes
-        if role.permrole.xproles is not None:
-            perms.xproles = role.permrole.xproles
-
-        if starboard_id in role.starboards and starboard_id is not None:
-            sbperms = role.starboards[starboard_id]
-            if sbperms.vote is not None:
-                perms.vote = sbperms.vote
-            if sbperms.recv_votes is not None:
-                perms.recv_votes = sbperms.recv_votes
-
-    return perms
+    return (await get_guild_permroles(guild)).get(
+        role_ids or set(), starboard_id
+    )
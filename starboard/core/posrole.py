@@ -22,17 +22,18 @@
 
 from __future__ import annotations
 
-from contextlib import suppress
 from typing import TYPE_CHECKING
 
-import hikari
 from apgorm import sql
+from cachetools import LFUCache
 from pycooldown import FixedCooldown
 
 from starboard.config import CONFIG
 from starboard.database import PosRole, PosRoleMember
 
+from .invalidation import BUS
 from .leaderboard import get_leaderboard
+from .roles import queue_roles, wait_roles
 
 if TYPE_CHECKING:
     from starboard.bot import Bot
@@ -40,6 +41,34 @@ if TYPE_CHECKING:
 
 LOCK: set[int] = set()
 COOLDOWN: FixedCooldown[int] = FixedCooldown(*CONFIG.guild_pr_cooldown)
+# guild_id -> posroles, ordered by max_members
+CACHE: LFUCache[int, list[PosRole]] = LFUCache(CONFIG.posrole_cache_size)
+
+
+async def get_posroles(guild_id: int) -> list[PosRole]:
+    if (c := CACHE.get(guild_id)) is not None:
+        return c
+
+    posroles = list(
+        await PosRole.fetch_query()
+        .where(guild_id=guild_id)
+        .order_by(PosRole.max_members)
+        .fetchmany()
+    )
+    CACHE[guild_id] = posroles
+    return posroles
+
+
+def _drop_posroles(guild_ids: set[int]) -> None:
+    for guild_id in guild_ids:
+        CACHE.pop(guild_id, None)
+
+
+BUS.register("posroles", _drop_posroles, CACHE.clear)
+
+
+def invalidate_posroles(guild_id: int) -> None:
+    BUS.publish("posroles", guild_id)
 
 
 async def update_posroles(bot: Bot, guild_id: int) -> bool:
@@ -61,34 +90,50 @@ async def _update_posroles(bot: Bot, guild_id: int) -> None:
         return
     add, remove = ret
 
-    for roleid, users in add.items():
-        for uid in users:
-            with suppress(hikari.NotFoundError, hikari.ForbiddenError):
-                await bot.rest.add_role_to_member(
-                    guild_id, uid, roleid, reason="Position-based Role Awards"
+    # apply the changes to the database in one go, then update discord
+    add_pairs = [(rid, uid) for rid, uids in add.items() for uid in uids]
+    rm_pairs = [(rid, uid) for rid, uids in remove.items() for uid in uids]
+    assert PosRoleMember.database.pool
+    async with PosRoleMember.database.pool.acquire() as con:
+        async with con.transaction():
+            if add_pairs:
+                await con.execute(
+                    "INSERT INTO posrole_members (role_id, user_id) "
+                    "SELECT * FROM unnest($1::numeric[], $2::numeric[]) "
+                    "ON CONFLICT DO NOTHING",
+                    [[r for r, _ in add_pairs], [u for _, u in add_pairs]],
                 )
-            await PosRoleMember(user_id=uid, role_id=roleid).create()
-
-    for roleid, users in remove.items():
-        await PosRoleMember.delete_query().where(role_id=roleid).where(
-            PosRoleMember.user_id.eq(sql(users).any)
-        ).execute()
-        for uid in users:
-            with suppress(hikari.NotFoundError, hikari.ForbiddenError):
-                await bot.rest.remove_role_from_member(
-                    guild_id, uid, roleid, reason="Position-based Role Awards"
+            if rm_pairs:
+                await con.execute(
+                    "DELETE FROM posrole_members USING "
+                    "unnest($1::numeric[], $2::numeric[]) AS d(role_id, "
+                    "user_id) WHERE posrole_members.role_id=d.role_id "
+                    "AND posrole_members.user_id=d.user_id",
+                    [[r for r, _ in rm_pairs], [u for _, u in rm_pairs]],
                 )
 
+    # one role update per member, with removals and additions combined
+    changes: dict[int, tuple[list[int], list[int]]] = {}
+    for rid, uid in add_pairs:
+        changes.setdefault(uid, ([], []))[0].append(rid)
+    for rid, uid in rm_pairs:
+        changes.setdefault(uid, ([], []))[1].append(rid)
+    for uid, (add_rids, rm_rids) in changes.items():
+        queue_roles(
+            bot,
+            guild_id,
+            uid,
+            add=add_rids,
+            remove=rm_rids,
+            reason="Position-based Role Awards",
+        )
+    await wait_roles(guild_id)
+
 
 async def _get_updates(
     guild_id: int,
 ) -> tuple[dict[int, set[int]], dict[int, set[int]]] | None:
-    posroles = (
-        await PosRole.fetch_query()
-        .where(guild_id=guild_id)
-        .order_by(PosRole.max_members)
-        .fetchmany()
-    )
+    posroles = await get_posroles(guild_id)
     if not posroles:
         return None
 
@@ -108,17 +153,16 @@ async def _get_updates(
 
     # get the description of what the posrole setup actually looks like, and
     # generate updates from it
-    removals: dict[int, set[int]] = {}
-    adds: dict[int, set[int]] = {}
-
-    for p in posroles:
-        curr = {
-            m.user_id
-            for m in await PosRoleMember.fetch_query()
-            .where(role_id=p.role_id)
-            .fetchmany()
-        }
-        adds[p.role_id] = wanted[p.role_id].difference(curr)
-        removals[p.role_id] = curr.difference(wanted[p.role_id])
+    current: dict[int, set[int]] = {p.role_id: set() for p in posroles}
+    for m in (
+        await PosRoleMember.fetch_query()
+        .where(PosRoleMember.role_id.eq(sql(list(current)).any))
+        .fetchmany()
+    ):
+        current[m.role_id].add(m.user_id)
 
+    adds = {rid: wanted[rid].difference(curr) for rid, curr in current.items()}
+    removals = {
+        rid: curr.difference(wanted[rid]) for rid, curr in current.items()
+    }
     return adds, removals
@@ -28,6 +28,7 @@ from datetime import datetime, timedelta, timezone
 from typing import TYPE_CHECKING
 
 import hikari
+from cachetools import LFUCache
 
 from starboard.config import CONFIG
 from starboard.database import (
@@ -39,22 +40,45 @@ from starboard.database import (
     User,
 )
 
+from .autostar import invalidate_autostar
+from .config import invalidate_config
+from .invalidation import BUS
+from .roles import queue_roles
+
 if TYPE_CHECKING:
     from starboard.bot import Bot
 
 
-async def _add_role(member: hikari.Member, role_id: int | None) -> None:
-    if role_id in member.role_ids or role_id is None:
-        return
-    with suppress(hikari.ForbiddenError, hikari.NotFoundError):
-        await member.add_role(role_id)
+# guild_id -> (premium_end, when it was fetched)
+PREMIUM: LFUCache[int, tuple[datetime | None, datetime]] = LFUCache(
+    CONFIG.premium_cache_size
+)
 
 
-async def _rm_role(member: hikari.Member, role_id: int | None) -> None:
-    if role_id not in member.role_ids or role_id is None:
-        return
-    with suppress(hikari.ForbiddenError, hikari.NotFoundError):
-        await member.remove_role(role_id)
+async def is_premium(guild_id: int) -> bool:
+    now = datetime.now(timezone.utc)
+    if (c := PREMIUM.get(guild_id)) is not None:
+        end, fetched_at = c
+        # refetch once premium_end passes, in case it was autoredeemed
+        if end is None or not (fetched_at < end <= now):
+            return end is not None
+
+    guild = await Guild.exists(guild_id=guild_id)
+    end = guild.premium_end if guild else None
+    PREMIUM[guild_id] = (end, now)
+    return end is not None
+
+
+def _drop_premium(guild_ids: set[int]) -> None:
+    for guild_id in guild_ids:
+        PREMIUM.pop(guild_id, None)
+
+
+BUS.register("premium", _drop_premium, PREMIUM.clear)
+
+
+def invalidate_premium(guild_id: int) -> None:
+    BUS.publish("premium", guild_id)
 
 
 async def _try_send(bot: Bot, channel: int, message: str) -> None:
@@ -63,6 +87,7 @@ async def _try_send(bot: Bot, channel: int, message: str) -> None:
 
 
 async def update_prem_locks(bot: Bot, guild_id: int) -> None:
+    invalidate_premium(guild_id)
     guild = await Guild.exists(guild_id=guild_id)
     if not guild:
         return
@@ -74,6 +99,8 @@ async def update_prem_locks(bot: Bot, guild_id: int) -> None:
         await AutoStarChannel.update_query().where(guild_id=guild_id).set(
             prem_locked=False
         ).execute()
+        invalidate_config(guild_id)
+        invalidate_autostar(guild_id)
         return
 
     # if we get here, the guild doesn't have premium
@@ -106,6 +133,8 @@ async def update_prem_locks(bot: Bot, guild_id: int) -> None:
             sb.prem_locked = False
             await sb.save()
 
+    invalidate_config(guild_id)
+
     num_asc = await AutoStarChannel.count(guild_id=guild_id, prem_locked=False)
     if (to_lock := num_asc - CONFIG.np_max_autostar) > 0:
         asc_to_lock = (
@@ -133,25 +162,29 @@ async def update_prem_locks(bot: Bot, guild_id: int) -> None:
             asc.prem_locked = False
             await asc.save()
 
+    invalidate_autostar(guild_id)
+
 
 async def update_supporter_roles(bot: Bot, user: User) -> None:
     if not CONFIG.main_guild:
         return
-    member = await bot.cache.gof_member(CONFIG.main_guild, user.user_id)
-    if not member:
-        return
     if (
         user.patreon_status is PatreonStatus.ACTIVE
         or user.patreon_status is PatreonStatus.DECLINED
     ):
-        await _add_role(member, CONFIG.patron_role)
-        await _add_role(member, CONFIG.donor_role)
+        add, remove = [CONFIG.patron_role, CONFIG.donor_role], []
     elif user.patreon_status is PatreonStatus.FORMER:
-        await _add_role(member, CONFIG.donor_role)
-        await _rm_role(member, CONFIG.patron_role)
+        add, remove = [CONFIG.donor_role], [CONFIG.patron_role]
     else:
-        await _rm_role(member, CONFIG.patron_role)
-        await _rm_role(member, CONFIG.donor_role)
+        add, remove = [], [CONFIG.patron_role, CONFIG.donor_role]
+
+    queue_roles(
+        bot,
+        CONFIG.main_guild,
+        user.user_id,
+        add=[r for r in add if r is not None],
+        remove=[r for r in remove if r is not None],
+    )
 
 
 async def try_autoredeem(bot: Bot, guild: Guild) -> hikari.Member | None:
@@ -219,4 +252,5 @@ async def redeem(bot: Bot, user_id: int, guild_id: int, months: int) -> bool:
             guild.premium_end = new
             await guild.save(con=con)
 
+    invalidate_premium(guild_id)
     return True
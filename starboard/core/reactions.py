@@ -30,14 +30,14 @@ import hikari
 from pycooldown import FixedCooldown
 
 from starboard.config import CONFIG
-from starboard.core.leaderboard import refresh_xp
 from starboard.core.posrole import update_posroles
 from starboard.core.xprole import refresh_xpr
-from starboard.database import Guild, Member, Message, Starboard
+from starboard.database import Member, Message
 from starboard.database.models.user import User
 
-from .config import StarboardConfig, get_config
+from .config import get_guild_configs
 from .messages import get_orig_message
+from .premium import is_premium
 from .starboards import refresh_message
 from .votes import add_votes, is_vote_valid_for, remove_votes
 
@@ -54,19 +54,18 @@ async def handle_reaction_add(event: hikari.GuildReactionAddEvent) -> None:
     bot = cast("Bot", event.app)
 
     emoji_str = _get_emoji_str_from_event(event)
-    if (
-        not emoji_str
-        or emoji_str not in await bot.cache.guild_vote_emojis(event.guild_id)
-        or COOLDOWN.update_ratelimit(event.guild_id)
+    if not emoji_str:
+        return
+    configs = await get_guild_configs(event.guild_id)
+    if emoji_str not in configs.vote_emojis or COOLDOWN.update_ratelimit(
+        event.guild_id
     ):
         return
 
     orig_msg = await get_orig_message(event.message_id)
 
     orig_chid = orig_msg.channel_id if orig_msg else event.channel_id
-    up_configs, down_configs = await _get_configs_for_emoji(
-        emoji_str, event.guild_id, orig_chid
-    )
+    up_configs, down_configs = configs.route(emoji_str, orig_chid)
     if not (up_configs or down_configs):
         return
 
@@ -89,9 +88,7 @@ async def handle_reaction_add(event: hikari.GuildReactionAddEvent) -> None:
         )
 
     # data for the person who reacted
-    await Member.get_or_create(
-        event.guild_id, event.member.id, event.member.is_bot
-    )
+    await Member.ensure(event.guild_id, event.member.id, event.member.is_bot)
 
     author = await User.fetch(user_id=orig_msg.author_id)
     author_obj = await bot.cache.gof_member(event.guild_id, author.user_id)
@@ -152,8 +149,7 @@ async def handle_reaction_add(event: hikari.GuildReactionAddEvent) -> None:
         is_downvote=True,
     )
 
-    guild = await Guild.fetch(guild_id=event.guild_id)
-    ip = guild.premium_end is not None
+    ip = await is_premium(event.guild_id)
 
     await refresh_message(
         cast("Bot", event.app),
@@ -161,7 +157,6 @@ async def handle_reaction_add(event: hikari.GuildReactionAddEvent) -> None:
         valid_upvote_starboard_ids.union(valid_downvote_starboard_ids),
         premium=ip,
     )
-    await refresh_xp(event.guild_id, orig_msg.author_id)
 
     if ip:
         asyncio.create_task(
@@ -176,9 +171,10 @@ async def handle_reaction_remove(
     bot = cast("Bot", event.app)
 
     emoji_str = _get_emoji_str_from_event(event)
-    if not emoji_str or emoji_str not in await bot.cache.guild_vote_emojis(
-        event.guild_id
-    ):
+    if not emoji_str:
+        return
+    configs = await get_guild_configs(event.guild_id)
+    if emoji_str not in configs.vote_emojis:
         return
 
     if COOLDOWN.update_ratelimit(event.guild_id):
@@ -188,22 +184,18 @@ async def handle_reaction_remove(
     if not orig_msg or orig_msg.frozen:
         return
 
-    up_sb, down_sb = await _get_configs_for_emoji(
-        emoji_str, event.guild_id, orig_msg.channel_id
-    )
+    up_sb, down_sb = configs.route(emoji_str, orig_msg.channel_id)
     valid_sbids = [sb.starboard.id for sb in up_sb + down_sb]
     if not (up_sb or down_sb):
         return
 
     await remove_votes(orig_msg.message_id, event.user_id, valid_sbids)
 
-    guild = await Guild.fetch(guild_id=event.guild_id)
-    ip = guild.premium_end is not None
+    ip = await is_premium(event.guild_id)
 
     await refresh_message(
         cast("Bot", event.app), orig_msg, valid_sbids, premium=ip
     )
-    await refresh_xp(event.guild_id, orig_msg.author_id)
 
     if ip:
         await refresh_xpr(bot, event.guild_id, orig_msg.author_id)
@@ -222,24 +214,3 @@ def _get_emoji_str_from_event(
     else:
         assert isinstance(event.emoji_name, hikari.UnicodeEmoji)
         return str(event.emoji_name)
-
-
-async def _get_configs_for_emoji(
-    emoji_str: str, guild_id: int, channel_id: int
-) -> tuple[list[StarboardConfig], list[StarboardConfig]]:
-    starboards = (
-        await Starboard.fetch_query().where(guild_id=guild_id).fetchmany()
-    )
-    upvote_configs: list[StarboardConfig] = []
-    downvote_configs: list[StarboardConfig] = []
-
-    for sb in starboards:
-        config = await get_config(sb, channel_id)
-        if not config.enabled:
-            continue
-        if emoji_str in config.upvote_emojis:
-            upvote_configs.append(config)
-        elif emoji_str in config.downvote_emojis:
-            downvote_configs.append(config)
-
-    return upvote_configs, downvote_configs
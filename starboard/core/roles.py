@@ -0,0 +1,203 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import asyncio
+import traceback
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Iterable
+
+import hikari
+
+from starboard.config import CONFIG
+
+if TYPE_CHECKING:
+    from starboard.bot import Bot
+
+
+@dataclass
+class RoleProgress:
+    queued: int = 0
+    done: int = 0
+    failed: int = 0
+    rest_calls: int = 0
+
+
+@dataclass
+class _GuildQueue:
+    # user_id -> role_id -> whether the role should be added (True) or
+    # removed (False). only the last change for each role is kept.
+    pending: dict[int, dict[int, bool]] = field(default_factory=dict)
+    reasons: dict[int, set[str]] = field(default_factory=dict)
+    progress: RoleProgress = field(default_factory=RoleProgress)
+    task: asyncio.Task | None = None
+
+
+QUEUES: dict[int, _GuildQueue] = {}
+_SEMAPHORE: asyncio.Semaphore | None = None
+
+
+def queue_roles(
+    bot: Bot,
+    guild_id: int,
+    user_id: int,
+    add: Iterable[int] = (),
+    remove: Iterable[int] = (),
+    reason: str | None = None,
+) -> None:
+    queue = QUEUES.get(guild_id)
+    if queue is None:
+        queue = QUEUES[guild_id] = _GuildQueue()
+
+    if user_id not in queue.pending:
+        queue.progress.queued += 1
+    changes = queue.pending.setdefault(user_id, {})
+    for rid in remove:
+        changes[rid] = False
+    for rid in add:
+        changes[rid] = True
+    if reason:
+        queue.reasons.setdefault(user_id, set()).add(reason)
+
+    if queue.task is None:
+        queue.task = asyncio.create_task(_worker(bot, guild_id, queue))
+
+
+async def wait_roles(guild_id: int) -> None:
+    if (queue := QUEUES.get(guild_id)) is not None and queue.task:
+        await asyncio.shield(queue.task)
+
+
+def get_progress(guild_id: int) -> RoleProgress | None:
+    if (queue := QUEUES.get(guild_id)) is not None:
+        return queue.progress
+    return None
+
+
+async def _worker(bot: Bot, guild_id: int, queue: _GuildQueue) -> None:
+    global _SEMAPHORE
+    if _SEMAPHORE is None:
+        _SEMAPHORE = asyncio.Semaphore(CONFIG.role_update_concurrency)
+
+    try:
+        while queue.pending:
+            pending, queue.pending = queue.pending, {}
+            reasons, queue.reasons = queue.reasons, {}
+            await asyncio.gather(
+                *(
+                    _apply(
+                        bot,
+                        guild_id,
+                        uid,
+                        changes,
+                        reasons.get(uid, set()),
+                        queue.progress,
+                    )
+                    for uid, changes in pending.items()
+                )
+            )
+    finally:
+        del QUEUES[guild_id]
+
+
+async def _apply(
+    bot: Bot,
+    guild_id: int,
+    user_id: int,
+    changes: dict[int, bool],
+    reasons: set[str],
+    progress: RoleProgress,
+) -> None:
+    assert _SEMAPHORE
+    async with _SEMAPHORE:
+        try:
+            worked = await _apply_member(
+                bot, guild_id, user_id, changes, reasons, progress
+            )
+        except (hikari.NotFoundError, hikari.ForbiddenError):
+            worked = False
+        except Exception:
+            worked = False
+            traceback.print_exc()
+
+    if worked:
+        progress.done += 1
+    else:
+        progress.failed += 1
+
+
+async def _apply_member(
+    bot: Bot,
+    guild_id: int,
+    user_id: int,
+    changes: dict[int, bool],
+    reasons: set[str],
+    progress: RoleProgress,
+) -> bool:
+    member = await bot.cache.gof_member(guild_id, user_id)
+    if member is None:
+        return False
+
+    final, added, removed = _diff(member, changes)
+    if not (added or removed):
+        return True
+
+    # a single change can use the role endpoints, which can't race with
+    # other changes to the member. anything more is sent as one PATCH.
+    reason = ", ".join(sorted(reasons)) or hikari.UNDEFINED
+    if len(added) == 1 and not removed:
+        progress.rest_calls += 1
+        await bot.rest.add_role_to_member(
+            guild_id, user_id, added.pop(), reason=reason
+        )
+        return True
+    if len(removed) == 1 and not added:
+        progress.rest_calls += 1
+        await bot.rest.remove_role_from_member(
+            guild_id, user_id, removed.pop(), reason=reason
+        )
+        return True
+
+    # the PATCH replaces every role, so it has to start from the member's
+    # current roles. the cached member isn't updated by the single-role
+    # calls, so it may be missing changes we made ourselves.
+    progress.rest_calls += 1
+    member = await bot.rest.fetch_member(guild_id, user_id)
+    final, added, removed = _diff(member, changes)
+    if added or removed:
+        progress.rest_calls += 1
+        member = await bot.rest.edit_member(
+            guild_id, user_id, roles=list(final), reason=reason
+        )
+    bot.cache.set_member(member)
+    return True
+
+
+def _diff(
+    member: hikari.Member, changes: dict[int, bool]
+) -> tuple[set[int], set[int], set[int]]:
+    current = {int(r) for r in member.role_ids}
+    current.discard(int(member.guild_id))
+    final = current.union(r for r, add in changes.items() if add)
+    final.difference_update(r for r, add in changes.items() if not add)
+    return final, final.difference(current), current.difference(final)
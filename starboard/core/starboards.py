@@ -23,27 +23,52 @@
 from __future__ import annotations
 
 import asyncio
+import json
+import time
 import traceback
 from contextlib import suppress
 from dataclasses import dataclass
 from typing import TYPE_CHECKING, Iterable
+from weakref import WeakValueDictionary
 
 import hikari
 from apgorm import sql
+from cachetools import LRUCache
 from pycooldown import FixedCooldown
 
 from starboard.config import CONFIG
-from starboard.database import Guild, Message, SBMessage, Starboard, Vote
+from starboard.database import Message, SBMessage, Starboard
 
-from .config import StarboardConfig, get_config
+from .config import CACHE as CONFIG_CACHE
+from .config import StarboardConfig, get_config, get_guild_configs
 from .has_image import has_image
-from .messages import get_sbmsg_content
+from .messages import get_sbmsg_content, track_sb_message
+from .metrics import count, histogram
+from .premium import is_premium
+from .votes import get_points
 
 if TYPE_CHECKING:
     from starboard.bot import Bot
 
 
-LOCK: set[int] = set()
+@dataclass
+class _Refresh:
+    sbids: set[int] | None
+    force: bool
+    premium: bool | None
+
+    def merge(self, other: _Refresh) -> None:
+        if self.sbids is None or other.sbids is None:
+            self.sbids = None
+        else:
+            self.sbids.update(other.sbids)
+        self.force = self.force or other.force
+        if other.premium is not None:
+            self.premium = other.premium
+
+
+# message_id -> follow-up refresh requested while one was already running
+REFRESHING: dict[int, _Refresh | None] = {}
 
 
 async def refresh_message(
@@ -53,23 +78,46 @@ async def refresh_message(
     force: bool = False,
     premium: bool | None = None,
 ) -> None:
-    if orig_message.message_id in LOCK:
+    mid = orig_message.message_id
+    req = _Refresh(set(sbids) if sbids else None, force, premium)
+    if mid in REFRESHING:
+        if (pending := REFRESHING[mid]) is not None:
+            pending.merge(req)
+        else:
+            REFRESHING[mid] = req
         return
 
-    LOCK.add(orig_message.message_id)
+    REFRESHING[mid] = None
+    error: Exception | None = None
+    next_req: _Refresh | None = req
     try:
-        if premium is None:
-            premium = (
-                await Guild.fetch(guild_id=orig_message.guild_id)
-            ).premium_end is not None
-
-        await orig_message.refetch()
-        if orig_message.trashed:
-            await _handle_trashed_message(bot, orig_message)
-        else:
-            await _refresh_message(bot, orig_message, sbids, force, premium)
+        while next_req is not None:
+            try:
+                await _run_refresh(bot, orig_message, next_req)
+            except Exception as e:
+                # still run any follow-up, then raise the first error
+                error = error or e
+            next_req = REFRESHING[mid]
+            REFRESHING[mid] = None
     finally:
-        LOCK.remove(orig_message.message_id)
+        del REFRESHING[mid]
+
+    if error is not None:
+        raise error
+
+
+async def _run_refresh(bot: Bot, orig_message: Message, req: _Refresh) -> None:
+    premium = req.premium
+    if premium is None:
+        premium = await is_premium(orig_message.guild_id)
+
+    await orig_message.refetch()
+    if orig_message.trashed:
+        await _handle_trashed_message(bot, orig_message)
+    else:
+        await _refresh_message(
+            bot, orig_message, req.sbids, req.force, premium
+        )
 
 
 async def _handle_trashed_message(bot: Bot, orig_message: Message) -> None:
@@ -131,23 +179,72 @@ async def _refresh_message(
             .where(prem_locked=False)
             .fetchmany()
         )
-    configs = [await get_config(s, orig_message.channel_id) for s in _s]
+    # resolved once here rather than by every starboard in the fan-out
+    guild_configs = await get_guild_configs(orig_message.guild_id)
+    configs = [
+        guild_configs.get(s.id, orig_message.channel_id)
+        if s.id in guild_configs.starboards
+        else await get_config(s, orig_message.channel_id)
+        for s in _s
+    ]
+    configs = [
+        c
+        for c in configs
+        if c.enabled or c.starboard.id in orig_message.forced_to
+    ]
+    if not configs:
+        return
 
-    for c in configs:
-        if not c.enabled and c.starboard.id not in orig_message.forced_to:
-            continue
-        try:
-            await _refresh_message_for_starboard(
-                bot, orig_message, c, force, premium
-            )
-        except Exception:
-            traceback.print_exc()
+    points = await get_points(orig_message.message_id)
+    orig_msg_obj = await bot.cache.gof_message(
+        orig_message.channel_id, orig_message.message_id
+    )
+
+    semaphore = _guild_semaphore(orig_message.guild_id)
+
+    async def refresh(c: StarboardConfig) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await _refresh_message_for_starboard(
+                    bot,
+                    orig_message,
+                    orig_msg_obj,
+                    c,
+                    points.get(c.starboard.id, 0),
+                    force,
+                    premium,
+                )
+            except Exception:
+                traceback.print_exc()
+            REFRESH_LATENCY.observe(time.perf_counter() - start)
+
+    await asyncio.gather(*(refresh(c) for c in configs))
+
+
+# guild_id -> semaphore limiting concurrent starboard refreshes. Unused
+# semaphores are dropped automatically.
+REFRESH_SEMAPHORES: WeakValueDictionary[
+    int, asyncio.Semaphore
+] = WeakValueDictionary()
+# the time taken to refresh a message on one starboard
+REFRESH_LATENCY = histogram("starboard_refresh")
+
+
+def _guild_semaphore(guild_id: int) -> asyncio.Semaphore:
+    if (s := REFRESH_SEMAPHORES.get(guild_id)) is None:
+        s = REFRESH_SEMAPHORES[guild_id] = asyncio.Semaphore(
+            CONFIG.refresh_concurrency
+        )
+    return s
 
 
 async def _refresh_message_for_starboard(
     bot: Bot,
     orig_msg: Message,
+    orig_msg_obj: hikari.Message | None,
     config: StarboardConfig,
+    points: int,
     force: bool,
     premium: bool,
 ) -> None:
@@ -158,11 +255,6 @@ async def _refresh_message_for_starboard(
         if sbchannel is None or sbchannel.is_nsfw is False:
             return
 
-    orig_msg_obj = await bot.cache.gof_message(
-        orig_msg.channel_id, orig_msg.message_id
-    )
-
-    points = await _get_points(orig_msg.message_id, config.starboard.id)
     action = _get_action(
         orig_msg, orig_msg_obj, config, points, orig_msg_obj is None
     )
@@ -199,6 +291,7 @@ async def _refresh_message_for_starboard(
             )
             if sbmsg_obj:
                 sbmsg.sb_message_id = sbmsg_obj.id
+                track_sb_message(sbmsg_obj.id, orig_msg.message_id)
                 await sbmsg.save()
                 if config.autoreact_upvote:
                     await _add_reactions(bot, config.upvote_emojis, sbmsg_obj)
@@ -216,11 +309,17 @@ async def _refresh_message_for_starboard(
         # edit the message
 
         if orig_msg_obj:
+            # a plain point change usually leaves the embeds as they were
             content, embed, embeds = await get_sbmsg_content(
-                bot, config, orig_msg_obj, orig_msg, points, premium
+                bot,
+                config,
+                orig_msg_obj,
+                orig_msg,
+                points,
+                premium,
+                only_changed=not force,
             )
-            assert embed
-            if config.link_edits:
+            if config.link_edits and embed is not None:
                 await _edit(
                     bot,
                     config,
@@ -271,6 +370,20 @@ EDIT_COOLDOWN: FixedCooldown[int] = FixedCooldown(
 )
 
 
+@dataclass
+class _DelayedEdit:
+    config: StarboardConfig
+    message: hikari.Message
+    content: str | None
+    embeds: list[hikari.Embed] | None
+    author_id: int
+    task: asyncio.Task | None = None
+
+
+# sb_message_id -> the latest edit that was ratelimited
+DELAYED_EDITS: dict[int, _DelayedEdit] = {}
+
+
 async def _edit(
     bot: Bot,
     config: StarboardConfig,
@@ -279,12 +392,111 @@ async def _edit(
     embeds: list[hikari.Embed] | None,
     author_id: int,
 ) -> None:
-    if EDIT_COOLDOWN.update_ratelimit(config.starboard.guild_id):
+    if retry_after := EDIT_COOLDOWN.update_ratelimit(
+        config.starboard.guild_id
+    ):
+        # replace any pending edit, but keep the original deadline
+        edit = _DelayedEdit(config, message, content, embeds, author_id)
+        if (pending := DELAYED_EDITS.get(message.id)) is not None:
+            edit.task = pending.task
+            # a content-only edit shouldn't discard pending embeds
+            if embeds is None:
+                edit.embeds = pending.embeds
+        else:
+            edit.task = asyncio.create_task(
+                _delayed_edit(bot, message.id, retry_after)
+            )
+        DELAYED_EDITS[message.id] = edit
+        return
+
+    if (pending := DELAYED_EDITS.pop(message.id, None)) is not None:
+        assert pending.task
+        pending.task.cancel()
+
+    await _do_edit(bot, config, message, content, embeds, author_id)
+
+
+async def _delayed_edit(bot: Bot, message_id: int, delay: float) -> None:
+    await asyncio.sleep(delay)
+    edit = DELAYED_EDITS.pop(message_id, None)
+    if edit is None:
+        return
+
+    try:
+        await _edit(
+            bot,
+            edit.config,
+            edit.message,
+            edit.content,
+            edit.embeds,
+            edit.author_id,
+        )
+    except Exception:
+        traceback.print_exc()
+
+
+async def flush_edits(bot: Bot) -> None:
+    edits = list(DELAYED_EDITS.values())
+    DELAYED_EDITS.clear()
+    for edit in edits:
+        assert edit.task
+        edit.task.cancel()
+        try:
+            await _do_edit(
+                bot,
+                edit.config,
+                edit.message,
+                edit.content,
+                edit.embeds,
+                edit.author_id,
+            )
+        except Exception:
+            traceback.print_exc()
+
+
+@dataclass
+class _SentPayload:
+    content: str | None
+    # the serialized embeds, or None if they are unknown
+    embeds: str | None
+
+
+# sb_message_id -> what was last sent for that message
+SENT: LRUCache[int, _SentPayload] = LRUCache(CONFIG.sent_payload_cache_size)
+
+
+def _serialize_embeds(bot: Bot, embeds: list[hikari.Embed]) -> str:
+    return json.dumps(
+        [bot.entity_factory.serialize_embed(e)[0] for e in embeds],
+        sort_keys=True,
+    )
+
+
+async def _do_edit(
+    bot: Bot,
+    config: StarboardConfig,
+    message: hikari.Message,
+    content: str | None,
+    embeds: list[hikari.Embed] | None,
+    author_id: int,
+) -> None:
+    # only send the fields that changed since the last send or edit
+    sent = SENT.get(message.id) or _SentPayload(None, None)
+    new_embeds = _serialize_embeds(bot, embeds) if embeds else None
+    if content == sent.content:
+        content = None
+    if new_embeds is not None and new_embeds == sent.embeds:
+        embeds = new_embeds = None
+    if not content and not embeds:
+        count("edits_skipped")
         return
 
     if message.author.id != bot.me.id:
+        # only our own webhook can edit the message
+        if message.author.id != config.starboard.webhook_id:
+            return
         wh = await _webhook(bot, config, False)
-        if not wh or wh.webhook_id != message.author.id:
+        if not wh:
             return
 
         await wh.edit_message(
@@ -301,6 +513,14 @@ async def _edit(
             user_mentions=(author_id,),
         )
 
+    count("edits_sent")
+    count("edit_payload_bytes", len(content or "") + len(new_embeds or ""))
+    if not embeds:
+        count("edits_content_only")
+    SENT[message.id] = _SentPayload(
+        content or sent.content, new_embeds or sent.embeds
+    )
+
 
 DELETE_COOLDOWN: FixedCooldown[int] = FixedCooldown(
     *CONFIG.guild_message_delete_cooldown
@@ -316,7 +536,9 @@ async def _delete(
     if message.author.id == bot.me.id:
         return await message.delete()
 
-    wh = await _webhook(bot, config, False)
+    wh = None
+    if message.author.id == config.starboard.webhook_id:
+        wh = await _webhook(bot, config, False)
     if wh is None:
         # try anyways. will work if bot has manage_messages
         with suppress(hikari.ForbiddenError):
@@ -342,24 +564,34 @@ async def _send(
 
     webhook = await _webhook(bot, config)
 
+    message: hikari.Message | None = None
     if webhook and config.use_webhook:
-        with suppress(hikari.NotFoundError):
-            botuser = bot.get_me()
-            assert botuser
-            return await webhook.execute(
+        try:
+            message = await webhook.execute(
                 content,
                 embeds=embeds or hikari.UNDEFINED,
                 user_mentions=(author_id,),
             )
+        except hikari.NotFoundError:
+            # the webhook was deleted, so forget it
+            bot.cache.delete_webhook(webhook.webhook_id)
+            config.starboard.webhook_id = None
+            await config.starboard.save()
 
-    with suppress(hikari.ForbiddenError, hikari.NotFoundError):
-        return await bot.rest.create_message(
-            config.starboard.channel_id,
-            content,
-            embeds=embeds or hikari.UNDEFINED,
-            user_mentions=(author_id,),
+    if message is None:
+        with suppress(hikari.ForbiddenError, hikari.NotFoundError):
+            message = await bot.rest.create_message(
+                config.starboard.channel_id,
+                content,
+                embeds=embeds or hikari.UNDEFINED,
+                user_mentions=(author_id,),
+            )
+
+    if message is not None:
+        SENT[message.id] = _SentPayload(
+            content, _serialize_embeds(bot, embeds) if embeds else None
         )
-    return None
+    return message
 
 
 async def _webhook(
@@ -396,24 +628,37 @@ async def _webhook(
     return wh
 
 
-async def _get_points(orig_msg_id: int, starboard_id: int) -> int:
-    upvotes = (
-        await Vote.fetch_query()
-        .where(
-            message_id=orig_msg_id,
-            starboard_id=starboard_id,
-            is_downvote=False,
-        )
-        .count()
-    )
-    downvotes = (
-        await Vote.fetch_query()
-        .where(
-            message_id=orig_msg_id, starboard_id=starboard_id, is_downvote=True
-        )
-        .count()
-    )
-    return upvotes - downvotes
+async def prewarm_webhooks(bot: Bot, guild_id: int) -> None:
+    """Resolves the webhooks of every starboard in a guild with one
+    request, so that sends and edits never have to fetch them.
+
+    Only guilds whose configs are already cached are prewarmed."""
+
+    if (configs := CONFIG_CACHE.get(guild_id)) is None:
+        return
+    wanted = {
+        sb.webhook_id
+        for sb in configs.starboards.values()
+        if sb.webhook_id is not None
+    }
+    if not wanted:
+        return
+
+    try:
+        webhooks = await bot.rest.fetch_guild_webhooks(guild_id)
+    except (hikari.ForbiddenError, hikari.NotFoundError):
+        return
+
+    for wh in webhooks:
+        if isinstance(wh, hikari.IncomingWebhook) and wh.token:
+            if wh.id in wanted:
+                wanted.discard(wh.id)
+                bot.cache.set_webhook(wh)
+
+    # whatever is left was deleted, or we can't see its token, so we can't
+    # use it. _webhook then replaces it without fetching it first.
+    for webhook_id in wanted:
+        bot.cache.delete_webhook(webhook_id)
 
 
 @dataclass(order=True)
@@ -22,18 +22,20 @@
 
 from __future__ import annotations
 
+import asyncio
 import datetime
-from typing import TYPE_CHECKING, Iterable
+import traceback
+from typing import TYPE_CHECKING, Any, Iterable
 
-import apgorm
-import asyncpg
 import hikari
+from cachetools import LFUCache
 from pycooldown import FlexibleCooldown
 
 from starboard.config import CONFIG
-from starboard.database import Message, User, Vote
+from starboard.database import Message, SBMessage, User, Vote
 
 from .config import StarboardConfig
+from .leaderboard import update_leaderboard
 from .permrole import get_permissions
 
 if TYPE_CHECKING:
@@ -43,6 +45,244 @@ if TYPE_CHECKING:
 COOLDOWN: FlexibleCooldown[tuple[int, int]] = FlexibleCooldown(
     CONFIG.max_cooldown_period
 )
+POINTS: LFUCache[int, dict[int, int]] = LFUCache(CONFIG.points_cache_size)
+
+
+class VoteBuffer:
+    """Collects vote writes and flushes them in batches."""
+
+    __slots__ = (
+        "ops",
+        "message_ids",
+        "in_flight",
+        "flushes",
+        "failures",
+        "_lock",
+        "_task",
+        "_tasks",
+    )
+
+    def __init__(self) -> None:
+        # (message_id, starboard_id, user_id) -> (target_author_id,
+        # is_downvote) for an upsert, or None for a delete. only the last
+        # op for each vote matters.
+        self.ops: dict[tuple[int, int, int], tuple[int, bool] | None] = {}
+        self.message_ids: set[int] = set()
+        # messages whose votes are being written, but aren't committed yet
+        self.in_flight: set[int] = set()
+        # how many flushes have finished, so readers can tell if their data
+        # might be stale
+        self.flushes = 0
+        # flushes that failed in a row
+        self.failures = 0
+        self._lock: asyncio.Lock | None = None
+        self._task: asyncio.Task | None = None
+        # every flush that was scheduled, so they can't be garbage collected
+        self._tasks: set[asyncio.Task] = set()
+
+    def add(
+        self,
+        message_id: int,
+        user_id: int,
+        starboard_ids: Iterable[int],
+        op: tuple[int, bool] | None,
+    ) -> None:
+        for sbid in starboard_ids:
+            self.ops[(message_id, sbid, user_id)] = op
+        self.message_ids.add(message_id)
+
+        if len(self.ops) >= CONFIG.vote_buffer_size:
+            self._schedule(0)
+        elif self._task is None:
+            self._task = self._schedule(CONFIG.vote_buffer_delay)
+
+    def is_pending(self, message_id: int) -> bool:
+        return message_id in self.message_ids or message_id in self.in_flight
+
+    def _schedule(self, delay: float) -> asyncio.Task:
+        task = asyncio.create_task(self._flush_after(delay))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _flush_after(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        if delay:
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            traceback.print_exc()
+
+    async def flush(self) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            if not self.ops:
+                return
+
+            ops = self.ops
+            message_ids = self.message_ids
+            self.ops = {}
+            self.message_ids = set()
+            self.in_flight = message_ids
+
+            upserts = [(k, v) for k, v in ops.items() if v is not None]
+            deletes = [k for k, v in ops.items() if v is None]
+
+            xp: list[Any] = []
+            assert Vote.database.pool
+            try:
+                async with Vote.database.pool.acquire() as con:
+                    async with con.transaction():
+                        if upserts:
+                            xp += await con.fetchmany(
+                                FLUSH_UPSERTS,
+                                [
+                                    [k[0] for k, _ in upserts],
+                                    [k[2] for k, _ in upserts],
+                                    [k[1] for k, _ in upserts],
+                                    [v[0] for _, v in upserts],
+                                    [v[1] for _, v in upserts],
+                                ],
+                            )
+                        if deletes:
+                            xp += await con.fetchmany(
+                                FLUSH_DELETES,
+                                [
+                                    [k[0] for k in deletes],
+                                    [k[2] for k in deletes],
+                                    [k[1] for k in deletes],
+                                ],
+                            )
+            except Exception:
+                self._retry(ops, message_ids)
+                raise
+            finally:
+                for mid in message_ids:
+                    POINTS.pop(mid, None)
+                self.in_flight = set()
+                self.flushes += 1
+
+            self.failures = 0
+            _update_leaderboards(xp)
+
+    def _retry(
+        self,
+        ops: dict[tuple[int, int, int], tuple[int, bool] | None],
+        message_ids: set[int],
+    ) -> None:
+        self.failures += 1
+        if self.failures > CONFIG.vote_buffer_retries:
+            # most likely something in the batch itself is broken
+            self.failures = 0
+            return
+
+        # anything buffered since is newer, so it wins
+        for key, op in ops.items():
+            self.ops.setdefault(key, op)
+        self.message_ids.update(message_ids)
+        if self._task is None:
+            self._task = self._schedule(CONFIG.vote_buffer_delay)
+
+
+FLUSH_UPSERTS = """
+WITH new_votes AS (
+    INSERT INTO votes
+        (message_id, user_id, starboard_id, target_author_id, is_downvote)
+    SELECT v.* FROM unnest(
+        $1::numeric[], $2::numeric[], $3::integer[], $4::numeric[],
+        $5::boolean[]
+    ) AS v(message_id, user_id, starboard_id, target_author_id, is_downvote)
+        JOIN starboards ON starboards.id=v.starboard_id
+    ON CONFLICT (message_id, starboard_id, user_id) DO UPDATE
+        SET is_downvote=EXCLUDED.is_downvote
+        WHERE votes.is_downvote <> EXCLUDED.is_downvote
+    RETURNING
+        message_id,
+        starboard_id,
+        target_author_id,
+        is_downvote,
+        (xmax = 0) AS inserted
+), xp AS (
+    UPDATE members SET xp=members.xp + d.xp
+    FROM (
+        SELECT starboards.guild_id, target_author_id, SUM(
+            starboards.xp_multiplier
+            * CASE WHEN inserted THEN 1 ELSE 2 END
+            * CASE WHEN is_downvote THEN -1 ELSE 1 END
+        ) AS xp
+        FROM new_votes
+            JOIN starboards ON starboards.id=new_votes.starboard_id
+        GROUP BY starboards.guild_id, target_author_id
+    ) AS d
+        WHERE members.guild_id=d.guild_id
+        AND members.user_id=d.target_author_id
+    RETURNING members.guild_id, members.user_id, members.xp
+), counters AS (
+    INSERT INTO sb_messages
+        (message_id, starboard_id, last_known_point_count, upvotes, downvotes)
+    SELECT
+        message_id,
+        starboard_id,
+        0,
+        SUM(CASE WHEN NOT is_downvote THEN 1 WHEN inserted THEN 0 ELSE -1 END),
+        SUM(CASE WHEN is_downvote THEN 1 WHEN inserted THEN 0 ELSE -1 END)
+    FROM new_votes
+    GROUP BY message_id, starboard_id
+    ON CONFLICT (message_id, starboard_id) DO UPDATE SET
+        upvotes=sb_messages.upvotes + EXCLUDED.upvotes,
+        downvotes=sb_messages.downvotes + EXCLUDED.downvotes
+)
+SELECT * FROM xp
+"""
+FLUSH_DELETES = """
+WITH old_votes AS (
+    DELETE FROM votes
+        USING unnest($1::numeric[], $2::numeric[], $3::integer[])
+        AS v(message_id, user_id, starboard_id)
+        WHERE votes.message_id=v.message_id
+        AND votes.user_id=v.user_id
+        AND votes.starboard_id=v.starboard_id
+    RETURNING
+        votes.message_id,
+        votes.starboard_id,
+        votes.target_author_id,
+        votes.is_downvote
+), xp AS (
+    UPDATE members SET xp=members.xp - d.xp
+    FROM (
+        SELECT starboards.guild_id, target_author_id, SUM(
+            starboards.xp_multiplier
+            * CASE WHEN is_downvote THEN -1 ELSE 1 END
+        ) AS xp
+        FROM old_votes
+            JOIN starboards ON starboards.id=old_votes.starboard_id
+        GROUP BY starboards.guild_id, target_author_id
+    ) AS d
+        WHERE members.guild_id=d.guild_id
+        AND members.user_id=d.target_author_id
+    RETURNING members.guild_id, members.user_id, members.xp
+), counts AS (
+    SELECT
+        message_id,
+        starboard_id,
+        COUNT(*) FILTER (WHERE NOT is_downvote) AS upvotes,
+        COUNT(*) FILTER (WHERE is_downvote) AS downvotes
+    FROM old_votes
+    GROUP BY message_id, starboard_id
+), counters AS (
+    UPDATE sb_messages SET
+        upvotes=sb_messages.upvotes - counts.upvotes,
+        downvotes=sb_messages.downvotes - counts.downvotes
+    FROM counts
+        WHERE sb_messages.message_id=counts.message_id
+        AND sb_messages.starboard_id=counts.starboard_id
+)
+SELECT * FROM xp
+"""
+BUFFER = VoteBuffer()
 
 
 async def is_vote_valid_for(
@@ -106,26 +346,200 @@ async def add_votes(
     target_author_id: int,
     is_downvote: bool,
 ) -> None:
-    for sbid in starboard_ids:
-        try:
-            await Vote(
-                message_id=orig_message_id,
-                user_id=user_id,
-                starboard_id=sbid,
-                target_author_id=target_author_id,
-                is_downvote=is_downvote,
-            ).create()
-        except asyncpg.UniqueViolationError:
-            await Vote.update_query().where(
-                message_id=orig_message_id, user_id=user_id, starboard_id=sbid
-            ).set(is_downvote=is_downvote).execute()
+    sbids = list(starboard_ids)
+    if not sbids:
+        return
+
+    if CONFIG.vote_buffer_enabled:
+        BUFFER.add(
+            orig_message_id, user_id, sbids, (target_author_id, is_downvote)
+        )
+        POINTS.pop(orig_message_id, None)
+        return
+
+    # inserts the votes and updates the stored counters and the author's xp
+    # in one statement. existing votes are only updated if they are flipped,
+    # and xmax=0 tells us whether the vote was inserted or flipped.
+    query = """
+    WITH new_votes AS (
+        INSERT INTO votes
+            (message_id, user_id, starboard_id, target_author_id, is_downvote)
+        SELECT $1::numeric, $2::numeric, sbid, $4::numeric, $5::boolean
+            FROM unnest($3::integer[]) AS sbid
+        ON CONFLICT (message_id, starboard_id, user_id) DO UPDATE
+            SET is_downvote=EXCLUDED.is_downvote
+            WHERE votes.is_downvote <> EXCLUDED.is_downvote
+        RETURNING starboard_id, (xmax = 0) AS inserted
+    ), xp AS (
+        UPDATE members SET xp=members.xp + d.xp
+        FROM (
+            SELECT starboards.guild_id, SUM(
+                starboards.xp_multiplier
+                * CASE WHEN inserted THEN 1 ELSE 2 END
+                * CASE WHEN $5::boolean THEN -1 ELSE 1 END
+            ) AS xp
+            FROM new_votes
+                JOIN starboards ON starboards.id=new_votes.starboard_id
+            GROUP BY starboards.guild_id
+        ) AS d
+            WHERE members.guild_id=d.guild_id
+            AND members.user_id=$4::numeric
+        RETURNING members.guild_id, members.user_id, members.xp
+    ), counters AS (
+        INSERT INTO sb_messages
+            (message_id, starboard_id, last_known_point_count, upvotes,
+            downvotes)
+        SELECT
+            $1::numeric,
+            starboard_id,
+            0,
+            CASE WHEN NOT $5::boolean THEN 1 WHEN inserted THEN 0 ELSE -1 END,
+            CASE WHEN $5::boolean THEN 1 WHEN inserted THEN 0 ELSE -1 END
+        FROM new_votes
+        ON CONFLICT (message_id, starboard_id) DO UPDATE SET
+            upvotes=sb_messages.upvotes + EXCLUDED.upvotes,
+            downvotes=sb_messages.downvotes + EXCLUDED.downvotes
+    )
+    SELECT * FROM xp
+    """
+    xp = await Vote.database.fetchmany(
+        query, [orig_message_id, user_id, sbids, target_author_id, is_downvote]
+    )
+    POINTS.pop(orig_message_id, None)
+    _update_leaderboards(xp)
 
 
 async def remove_votes(
     orig_message_id: int, user_id: int, starboard_ids: list[int]
 ) -> None:
-    await Vote.delete_query().where(
-        message_id=orig_message_id,
-        user_id=user_id,
-        starboard_id=apgorm.sql(starboard_ids).any,
-    ).execute()
+    if CONFIG.vote_buffer_enabled:
+        BUFFER.add(orig_message_id, user_id, starboard_ids, None)
+        POINTS.pop(orig_message_id, None)
+        return
+
+    query = """
+    WITH old_votes AS (
+        DELETE FROM votes
+            WHERE message_id=$1
+            AND user_id=$2
+            AND starboard_id=ANY($3::integer[])
+        RETURNING starboard_id, is_downvote, target_author_id
+    ), xp AS (
+        UPDATE members SET xp=members.xp - d.xp
+        FROM (
+            SELECT starboards.guild_id, target_author_id, SUM(
+                starboards.xp_multiplier
+                * CASE WHEN is_downvote THEN -1 ELSE 1 END
+            ) AS xp
+            FROM old_votes
+                JOIN starboards ON starboards.id=old_votes.starboard_id
+            GROUP BY starboards.guild_id, target_author_id
+        ) AS d
+            WHERE members.guild_id=d.guild_id
+            AND members.user_id=d.target_author_id
+        RETURNING members.guild_id, members.user_id, members.xp
+    ), counters AS (
+        UPDATE sb_messages SET
+            upvotes=upvotes - (NOT old_votes.is_downvote)::integer,
+            downvotes=downvotes - old_votes.is_downvote::integer
+        FROM old_votes
+            WHERE sb_messages.message_id=$1
+            AND sb_messages.starboard_id=old_votes.starboard_id
+    )
+    SELECT * FROM xp
+    """
+    xp = await Vote.database.fetchmany(
+        query, [orig_message_id, user_id, starboard_ids]
+    )
+    POINTS.pop(orig_message_id, None)
+    _update_leaderboards(xp)
+
+
+def _update_leaderboards(rows: Iterable[Any]) -> None:
+    for r in rows:
+        update_leaderboard(int(r["guild_id"]), int(r["user_id"]), r["xp"])
+
+
+async def get_points(orig_message_id: int) -> dict[int, int]:
+    if BUFFER.is_pending(orig_message_id):
+        # read-your-writes: pending votes for this message have to be written
+        # before the counters can be trusted. this also waits for a flush
+        # that is already running.
+        await BUFFER.flush()
+
+    if (c := POINTS.get(orig_message_id)) is not None:
+        return c
+
+    flushes = BUFFER.flushes
+    points = {
+        sbm.starboard_id: sbm.upvotes - sbm.downvotes
+        for sbm in await SBMessage.fetch_query()
+        .where(message_id=orig_message_id)
+        .fetchmany()
+    }
+
+    # don't cache counters that a flush may have changed while reading
+    if flushes == BUFFER.flushes and not BUFFER.is_pending(orig_message_id):
+        POINTS[orig_message_id] = points
+    return points
+
+
+async def rebuild_points(guild_id: int | None = None) -> int:
+    """Recounts the stored upvotes and downvotes from the votes table.
+
+    Returns the number of sb_messages that were corrected.
+    """
+
+    await BUFFER.flush()
+
+    rebuild = """
+    WITH counts AS (
+        SELECT
+            votes.message_id,
+            votes.starboard_id,
+            COUNT(*) FILTER (WHERE is_downvote=false) AS upvotes,
+            COUNT(*) FILTER (WHERE is_downvote=true) AS downvotes
+        FROM votes
+            JOIN starboards ON starboards.id=votes.starboard_id
+            WHERE ($1::numeric IS NULL OR starboards.guild_id=$1)
+        GROUP BY votes.message_id, votes.starboard_id
+    ), fixed AS (
+        INSERT INTO sb_messages
+            (message_id, starboard_id, last_known_point_count, upvotes,
+            downvotes)
+        SELECT message_id, starboard_id, 0, upvotes, downvotes FROM counts
+        ON CONFLICT (message_id, starboard_id) DO UPDATE SET
+            upvotes=EXCLUDED.upvotes,
+            downvotes=EXCLUDED.downvotes
+            WHERE sb_messages.upvotes <> EXCLUDED.upvotes
+            OR sb_messages.downvotes <> EXCLUDED.downvotes
+        RETURNING 1
+    )
+    SELECT COUNT(*) FROM fixed
+    """
+    clear = """
+    WITH fixed AS (
+        UPDATE sb_messages SET upvotes=0, downvotes=0
+            WHERE (upvotes <> 0 OR downvotes <> 0)
+            AND starboard_id IN (
+                SELECT id FROM starboards
+                    WHERE ($1::numeric IS NULL OR guild_id=$1)
+            )
+            AND NOT EXISTS (
+                SELECT 1 FROM votes
+                    WHERE votes.message_id=sb_messages.message_id
+                    AND votes.starboard_id=sb_messages.starboard_id
+            )
+        RETURNING 1
+    )
+    SELECT COUNT(*) FROM fixed
+    """
+
+    assert Vote.database.pool
+    async with Vote.database.pool.acquire() as con:
+        async with con.transaction():
+            fixed = int(await con.fetchval(rebuild, [guild_id]))
+            fixed += int(await con.fetchval(clear, [guild_id]))
+
+    POINTS.clear()
+    return fixed
@@ -0,0 +1,213 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import time
+import traceback
+from typing import TYPE_CHECKING, Any, AsyncIterable, AsyncIterator, Mapping
+
+from cachetools import Cache
+
+from starboard.database import Override, PosRole, Starboard, XPRole
+from starboard.database.models.message import TRACKED
+from starboard.utils import owned
+
+from . import config, permrole, posrole, xprole
+from .invalidation import BUS
+from .starboards import prewarm_webhooks
+
+if TYPE_CHECKING:
+    from starboard.bot import Bot
+
+
+async def warm_up(bot: Bot) -> None:
+    try:
+        await _warm_up(bot)
+    except Exception:
+        traceback.print_exc()
+
+
+async def _warm_up(bot: Bot) -> None:
+    """Loads the starboards, overrides, permroles, xproles and posroles of
+    the guilds this cluster owns into their caches, fills the filter of
+    tracked messages, and then prewarms the starboard webhooks.
+
+    Each cache is only filled up to its free space, and guilds are cached
+    as their rows are read."""
+
+    start = time.perf_counter()
+    params = [bot.cluster.shard_count, list(bot.cluster.shard_ids)]
+    starboards: dict[int, list[Starboard]] = {}
+    overrides: dict[int, list[Override]] = {}
+    guilds: set[int] = set()
+    rows = 0
+
+    assert bot.database.pool
+    with BUS.watch() as touched:
+
+        def fresh(kind: str, guild_id: int) -> bool:
+            # skip anything invalidated while it was being loaded
+            return touched.isdisjoint(((kind, guild_id), (kind, None)))
+
+        async with bot.database.pool.acquire() as con:
+            # server-side cursors only exist inside a transaction
+            async with con.transaction():
+                # a guild's config needs both its starboards and overrides,
+                # so the starboards are held until the overrides are read
+                async for guild_id, rs in _by_guild(
+                    con.cursor(
+                        f"SELECT * FROM starboards WHERE {owned()} "
+                        "ORDER BY guild_id",
+                        params,
+                    ),
+                    _room(config.CACHE),
+                ):
+                    starboards[guild_id] = [
+                        Starboard._from_raw(**r) for r in rs
+                    ]
+                    rows += len(rs)
+                async for guild_id, rs in _by_guild(
+                    con.cursor(
+                        "SELECT * FROM overrides "
+                        "WHERE guild_id=ANY($1::numeric[]) "
+                        "ORDER BY guild_id, id",
+                        [list(starboards)],
+                    ),
+                    len(starboards),
+                ):
+                    overrides[guild_id] = [Override._from_raw(**r) for r in rs]
+                    rows += len(rs)
+                for guild_id, sbs in starboards.items():
+                    if guild_id not in config.CACHE and fresh(
+                        "config", guild_id
+                    ):
+                        config.CACHE[guild_id] = config.GuildConfigs(
+                            sbs, overrides.get(guild_id, [])
+                        )
+                guilds.update(starboards)
+                overrides.clear()
+
+                async for guild_id, rs in _by_guild(
+                    con.cursor(
+                        permrole.PERMROLE_QUERY
+                        + f"WHERE {owned('permroles.guild_id')} "
+                        "ORDER BY permroles.guild_id",
+                        params,
+                    ),
+                    _room(permrole.PREFETCHED),
+                ):
+                    rows += len(rs)
+                    guilds.add(guild_id)
+                    if guild_id not in permrole.CACHE and fresh(
+                        "permroles", guild_id
+                    ):
+                        permrole.PREFETCHED[guild_id] = list(
+                            permrole.build_permroles(rs).values()
+                        )
+                async for guild_id, rs in _by_guild(
+                    con.cursor(
+                        f"SELECT * FROM xproles WHERE {owned()} "
+                        "ORDER BY guild_id",
+                        params,
+                    ),
+                    _room(xprole.CACHE),
+                ):
+                    rows += len(rs)
+                    guilds.add(guild_id)
+                    if guild_id not in xprole.CACHE and fresh(
+                        "xproles", guild_id
+                    ):
+                        xprole.CACHE[guild_id] = [
+                            XPRole._from_raw(**r) for r in rs
+                        ]
+                async for guild_id, rs in _by_guild(
+                    con.cursor(
+                        f"SELECT * FROM posroles WHERE {owned()} "
+                        "ORDER BY guild_id, max_members",
+                        params,
+                    ),
+                    _room(posrole.CACHE),
+                ):
+                    rows += len(rs)
+                    guilds.add(guild_id)
+                    if guild_id not in posrole.CACHE and fresh(
+                        "posroles", guild_id
+                    ):
+                        posrole.CACHE[guild_id] = [
+                            PosRole._from_raw(**r) for r in rs
+                        ]
+
+                # every message and starboard message this cluster tracks
+                async for r in con.cursor(
+                    f"SELECT message_id FROM messages WHERE {owned()}", params
+                ):
+                    TRACKED.add(int(r["message_id"]))
+                    rows += 1
+                async for r in con.cursor(
+                    "SELECT sb_message_id FROM sb_messages JOIN starboards "
+                    "ON starboards.id=sb_messages.starboard_id "
+                    "WHERE sb_message_id IS NOT NULL "
+                    f"AND {owned('starboards.guild_id')}",
+                    params,
+                ):
+                    TRACKED.add(int(r["sb_message_id"]))
+                    rows += 1
+                TRACKED.ready = True
+
+    bot.cluster.logger.info(
+        f"Warmed up {len(guilds)} guild(s) from {rows} row(s) in "
+        f"{time.perf_counter() - start:.2f}s."
+    )
+
+    # guilds that became available before their configs were loaded were
+    # skipped by on_guild_available
+    for guild_id in starboards:
+        await prewarm_webhooks(bot, guild_id)
+
+
+def _room(cache: Cache[Any, Any]) -> int:
+    return int(cache.maxsize - cache.currsize)
+
+
+async def _by_guild(
+    cursor: AsyncIterable[Mapping[str, Any]], limit: int
+) -> AsyncIterator[tuple[int, list[Mapping[str, Any]]]]:
+    """Groups the rows of a cursor ordered by guild_id, for at most `limit`
+    guilds."""
+
+    if limit <= 0:
+        return
+
+    guild_id = -1
+    rows: list[Mapping[str, Any]] = []
+    async for r in cursor:
+        if (gid := int(r["guild_id"])) != guild_id:
+            if rows:
+                yield guild_id, rows
+                limit -= 1
+                if limit == 0:
+                    return
+            guild_id, rows = gid, []
+        rows.append(r)
+    if rows:
+        yield guild_id, rows
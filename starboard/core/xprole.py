@@ -22,20 +22,44 @@
 
 from __future__ import annotations
 
-from contextlib import suppress
 from typing import TYPE_CHECKING
 
-import hikari
+from cachetools import LFUCache
 from pycooldown import FixedCooldown
 
 from starboard.config import CONFIG
 from starboard.database import Member, XPRole
 
+from .invalidation import BUS
+from .roles import queue_roles
+
 if TYPE_CHECKING:
     from starboard.bot import Bot
 
 
 COOLDOWN: FixedCooldown[int] = FixedCooldown(*CONFIG.user_xpr_cooldown)
+CACHE: LFUCache[int, list[XPRole]] = LFUCache(CONFIG.xprole_cache_size)
+
+
+async def get_xproles(guild_id: int) -> list[XPRole]:
+    if (c := CACHE.get(guild_id)) is not None:
+        return c
+
+    xpr = list(await XPRole.fetch_query().where(guild_id=guild_id).fetchmany())
+    CACHE[guild_id] = xpr
+    return xpr
+
+
+def _drop_xproles(guild_ids: set[int]) -> None:
+    for guild_id in guild_ids:
+        CACHE.pop(guild_id, None)
+
+
+BUS.register("xproles", _drop_xproles, CACHE.clear)
+
+
+def invalidate_xproles(guild_id: int) -> None:
+    BUS.publish("xproles", guild_id)
 
 
 async def refresh_xpr(bot: Bot, guild_id: int, user_id: int) -> bool:
@@ -47,7 +71,7 @@ async def refresh_xpr(bot: Bot, guild_id: int, user_id: int) -> bool:
         return True
     member = await Member.get_or_create(guild_id, user_id, obj.is_bot)
 
-    xpr = await XPRole.fetch_query().where(guild_id=guild_id).fetchmany()
+    xpr = await get_xproles(guild_id)
     if not xpr:
         return True
 
@@ -60,11 +84,13 @@ async def refresh_xpr(bot: Bot, guild_id: int, user_id: int) -> bool:
         r for r in xpr if member.xp < r.required and r.role_id in obj.role_ids
     ]
 
-    with suppress(hikari.ForbiddenError):
-        for r in remove:
-            with suppress(hikari.NotFoundError):
-                await obj.remove_role(r.role_id, reason="XPRoles")
-        for r in add:
-            with suppress(hikari.NotFoundError):
-                await obj.add_role(r.role_id, reason="XPRoles")
+    if add or remove:
+        queue_roles(
+            bot,
+            guild_id,
+            user_id,
+            add=[r.role_id for r in add],
+            remove=[r.role_id for r in remove],
+            reason="XPRoles",
+        )
     return True
@@ -45,8 +45,6 @@ class Database(apgorm.Database):
     def __init__(self):
         super().__init__("starboard/database/migrations")
 
-        self.asc: set[int] = set()
-
     async def connect(
         self, *, migrate: bool = False, **connect_kwargs
     ) -> None:
@@ -57,13 +55,6 @@ class Database(apgorm.Database):
             print("Applying migrations...")
             await self.apply_migrations()
 
-        print("Loading autostar channels...")
-        self.asc = {
-            a.channel_id
-            for a in await aschannel.AutoStarChannel.fetch_query().fetchmany()
-        }
-        print("Autostar channels loaded.")
-
     guilds = guild.Guild
     users = user.User
     patrons = user.Patron
@@ -0,0 +1,20 @@
+ALTER TABLE sb_messages ADD COLUMN upvotes INTEGER;
+ALTER TABLE sb_messages ADD COLUMN downvotes INTEGER;
+INSERT INTO sb_messages (message_id, starboard_id, last_known_point_count)
+    SELECT DISTINCT message_id, starboard_id, 0 FROM votes
+    ON CONFLICT (message_id, starboard_id) DO NOTHING;
+UPDATE sb_messages SET upvotes=0, downvotes=0;
+UPDATE sb_messages SET upvotes=counts.upvotes, downvotes=counts.downvotes
+    FROM (
+        SELECT
+            message_id,
+            starboard_id,
+            COUNT(*) FILTER (WHERE is_downvote=false) AS upvotes,
+            COUNT(*) FILTER (WHERE is_downvote=true) AS downvotes
+        FROM votes
+        GROUP BY message_id, starboard_id
+    ) AS counts
+    WHERE sb_messages.message_id=counts.message_id
+    AND sb_messages.starboard_id=counts.starboard_id;
+ALTER TABLE sb_messages ALTER COLUMN upvotes SET NOT NULL;
+ALTER TABLE sb_messages ALTER COLUMN downvotes SET NOT NULL;
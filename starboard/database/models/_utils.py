@@ -22,22 +22,59 @@
 
 from __future__ import annotations
 
-from typing import Any, TypeVar
+from typing import Any, Iterable, TypeVar
 
-from apgorm import Model, join, raw, sql
+from apgorm import Block, Model, join, raw, sql
 
 _T = TypeVar("_T", bound=Model)
 
 
+def _insert(tablename: str, fields: dict[str, Any]) -> Block[Any]:
+    return sql(
+        raw(f"INSERT INTO {tablename}"),
+        join(raw(","), *(raw(n) for n in fields), wrap=True),
+        raw("VALUES"),
+        join(raw(","), *fields.values(), wrap=True),
+        raw("ON CONFLICT"),
+    )
+
+
+def _ensure_ctes(models: Iterable[Model]) -> list[Block[Any]]:
+    return [
+        sql(
+            raw(f"_e{x} AS"),
+            sql(
+                _insert(m.tablename, m._raw_values),
+                raw("DO NOTHING"),
+                wrap=True,
+            ),
+        )
+        for x, m in enumerate(models)
+    ]
+
+
+async def ensure_exists(*models: Model) -> None:
+    """Inserts each model if it doesn't already exist, in one statement.
+
+    Foreign keys are checked at the end of the statement, so parents can be
+    passed alongside their children."""
+
+    if not models:
+        return
+    final = sql(
+        raw("WITH"), join(raw(","), *_ensure_ctes(models)), raw("SELECT 1")
+    )
+    await models[0].database.execute(*final.render())
+
+
 async def goc(
-    model: type[_T], get_fields: dict[str, Any], create_fields: dict[str, Any]
+    model: type[_T],
+    get_fields: dict[str, Any],
+    create_fields: dict[str, Any],
+    parents: Iterable[Model] = (),
 ) -> _T:
     ins = sql(
-        raw(f"INSERT INTO {model.tablename}"),
-        join(raw(","), *(raw(n) for n in create_fields), wrap=True),
-        raw("VALUES"),
-        join(raw(","), *create_fields.values(), wrap=True),
-        raw("ON CONFLICT"),
+        _insert(model.tablename, create_fields),
         join(raw(","), *(raw(n) for n in get_fields), wrap=True),
         raw("DO NOTHING RETURNING *"),
     )
@@ -49,12 +86,57 @@ async def goc(
         ),
     )
     final = sql(
-        raw("WITH ins AS"),
+        raw("WITH"),
+        *(sql(cte, raw(",")) for cte in _ensure_ctes(parents)),
+        raw("ins AS"),
         sql(ins, wrap=True),
         raw(", sel AS"),
         sql(sel, wrap=True),
-        raw("\nSELECT * FROM ins UNION SELECT * FROM sel"),
+        raw("\nSELECT * FROM ins UNION ALL SELECT * FROM sel LIMIT 1"),
     )
     dct = await model.database.fetchrow(*final.render())
-    assert dct
+    if dct is None:
+        # a concurrent insert committed after this statement's snapshot
+        return await model.fetch(**get_fields)
     return model._from_raw(**dct)
+
+
+_MASK = (1 << 64) - 1
+
+
+def _mix(x: int) -> int:
+    # splitmix64, so that sequential snowflakes spread over the whole filter
+    x = (x + 0x9E3779B97F4A7C15) & _MASK
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK
+    return x ^ (x >> 31)
+
+
+class BloomFilter:
+    """A set of ints that can have false positives, but no false negatives.
+
+    Until `ready` is set, every key is assumed to be present."""
+
+    __slots__ = ("size", "hashes", "bits", "ready")
+
+    def __init__(self, size: int, hashes: int) -> None:
+        self.size = size
+        self.hashes = hashes
+        self.bits = bytearray((size + 7) // 8)
+        self.ready = False
+
+    def _positions(self, key: int) -> Iterable[int]:
+        x = _mix(key)
+        h1, h2 = x & 0xFFFFFFFF, (x >> 32) | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: int) -> None:
+        for p in self._positions(key):
+            self.bits[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, key: int) -> bool:
+        if not self.ready:
+            return True
+        return all(
+            self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key)
+        )
@@ -26,15 +26,22 @@ from typing import Iterable
 
 import apgorm
 from apgorm import types
-from asyncpg import UniqueViolationError
+from cachetools import LRUCache
 
 from starboard.config import CONFIG
 
 from ._converters import DecimalC
+from ._utils import ensure_exists, goc
 from ._validators import num_range
 from .guild import Guild
 from .user import User
 
+# (guild_id, user_id) of members known to exist. members are never deleted,
+# so entries can't go stale.
+KNOWN_MEMBERS: LRUCache[tuple[int, int], None] = LRUCache(
+    CONFIG.known_member_cache_size
+)
+
 
 class Member(apgorm.Model):
     __slots__: Iterable[str] = ()
@@ -58,15 +65,28 @@ class Member(apgorm.Model):
     async def get_or_create(
         guild_id: int, user_id: int, is_bot: bool
     ) -> Member:
-        if (
-            m := await Member.exists(guild_id=guild_id, user_id=user_id)
-        ) is not None:
-            return m
-
-        await Guild.get_or_create(guild_id)
-        await User.get_or_create(user_id, is_bot)
-
-        try:
-            return await Member(guild_id=guild_id, user_id=user_id).create()
-        except UniqueViolationError:
-            return await Member.fetch(guild_id=guild_id, user_id=user_id)
+        m = await goc(
+            Member,
+            {"guild_id": guild_id, "user_id": user_id},
+            Member(guild_id=guild_id, user_id=user_id)._raw_values,
+            Member._parents(guild_id, user_id, is_bot),
+        )
+        KNOWN_MEMBERS[(guild_id, user_id)] = None
+        return m
+
+    @staticmethod
+    async def ensure(guild_id: int, user_id: int, is_bot: bool) -> None:
+        if (guild_id, user_id) in KNOWN_MEMBERS:
+            return
+
+        await ensure_exists(
+            *Member._parents(guild_id, user_id, is_bot),
+            Member(guild_id=guild_id, user_id=user_id),
+        )
+        KNOWN_MEMBERS[(guild_id, user_id)] = None
+
+    @staticmethod
+    def _parents(
+        guild_id: int, user_id: int, is_bot: bool
+    ) -> list[apgorm.Model]:
+        return [Guild(guild_id=guild_id), User(user_id=user_id, is_bot=is_bot)]
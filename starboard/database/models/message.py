@@ -26,13 +26,19 @@ from typing import Iterable
 
 import apgorm
 from apgorm import types
-from asyncpg import UniqueViolationError
+
+from starboard.config import CONFIG
 
 from ._converters import DecimalC, NonNullArray
+from ._utils import BloomFilter, goc
 from .guild import Guild
-from .member import Member
+from .member import KNOWN_MEMBERS, Member
 from .user import User
 
+# ids of every message and starboard message that might be tracked, for
+# guilds on this cluster. filled at startup, and on every insert after that.
+TRACKED = BloomFilter(CONFIG.tracked_filter_bits, CONFIG.tracked_filter_hashes)
+
 
 class Message(apgorm.Model):
     __slots__: Iterable[str] = ()
@@ -68,18 +74,29 @@ class Message(apgorm.Model):
         author_id: int,
         is_author_bot: bool,
     ) -> Message:
+        TRACKED.add(message_id)
         if (m := await Message.exists(message_id=message_id)) is not None:
             return m
 
-        await Member.get_or_create(guild_id, author_id, is_author_bot)
-
-        try:
-            return await Message(
+        # creates the guild, user, and member (if needed) in the same
+        # statement as the message
+        known = (guild_id, author_id) in KNOWN_MEMBERS
+        m = await goc(
+            Message,
+            {"message_id": message_id},
+            Message(
                 guild_id=guild_id,
                 author_id=author_id,
                 channel_id=channel_id,
                 message_id=message_id,
                 is_nsfw=is_nsfw,
-            ).create()
-        except UniqueViolationError:
-            return await Message.fetch(message_id=message_id)
+            )._raw_values,
+            []
+            if known
+            else [
+                *Member._parents(guild_id, author_id, is_author_bot),
+                Member(guild_id=guild_id, user_id=author_id),
+            ],
+        )
+        KNOWN_MEMBERS[(guild_id, author_id)] = None
+        return m
@@ -42,6 +42,8 @@ class SBMessage(apgorm.Model):
     )
 
     last_known_point_count = types.SmallInt().field(default=0)
+    upvotes = types.Int().field(default=0)
+    downvotes = types.Int().field(default=0)
 
     message_id_fk = apgorm.ForeignKey(message_id, Message.message_id)
     starboard_id_fk = apgorm.ForeignKey(starboard_id, Starboard.id)
@@ -34,3 +34,9 @@ plugin = crescent.Plugin()
 @crescent.event
 async def on_msg(event: hikari.GuildMessageCreateEvent) -> None:
     await autostar.handle_message(event)
+
+
+@plugin.include
+@crescent.event
+async def on_msg_update(event: hikari.GuildMessageUpdateEvent) -> None:
+    await autostar.handle_update(event)
@@ -22,13 +22,17 @@
 
 from __future__ import annotations
 
+import json
 from typing import TYPE_CHECKING, cast
 
 import crescent
 import hikari
 
+from starboard.core.config import get_guild_configs
 from starboard.core.messages import get_orig_message
+from starboard.core.metrics import count
 from starboard.core.starboards import refresh_message
+from starboard.database.models.message import TRACKED
 
 if TYPE_CHECKING:
     from starboard.bot import Bot
@@ -37,13 +41,70 @@ if TYPE_CHECKING:
 plugin = crescent.Plugin()
 
 
+def _embeds(bot: Bot, message: hikari.PartialMessage) -> str | None:
+    if message.embeds is hikari.UNDEFINED:
+        return None
+    return json.dumps(
+        [bot.entity_factory.serialize_embed(e)[0] for e in message.embeds],
+        sort_keys=True,
+    )
+
+
+def _is_unchanged(bot: Bot, event: hikari.GuildMessageUpdateEvent) -> bool:
+    new, old = event.message, event.old_message
+    if (
+        new.content is hikari.UNDEFINED
+        and new.embeds is hikari.UNDEFINED
+        and new.attachments is hikari.UNDEFINED
+    ):
+        return True
+    if old is None:
+        return False
+
+    # fields that are UNDEFINED in the new message weren't changed. if they
+    # are UNDEFINED in the old one, we don't know, so we refresh.
+    if new.content is not hikari.UNDEFINED and new.content != old.content:
+        return False
+    if new.attachments is not hikari.UNDEFINED:
+        if old.attachments is hikari.UNDEFINED:
+            return False
+        if [a.id for a in new.attachments] != [a.id for a in old.attachments]:
+            return False
+    return new.embeds is hikari.UNDEFINED or _embeds(bot, new) == _embeds(
+        bot, old
+    )
+
+
+async def _should_refresh(kind: str, guild_id: int, message_id: int) -> bool:
+    # cheapest checks first, and count where each event stops. the filter
+    # is in memory, while the configs may have to be loaded.
+    if message_id not in TRACKED:
+        count(f"{kind}_untracked")
+        return False
+    if not (await get_guild_configs(guild_id)).starboards:
+        count(f"{kind}_no_starboards")
+        return False
+    return True
+
+
 @plugin.include
 @crescent.event
 async def on_message_edit(event: hikari.GuildMessageUpdateEvent) -> None:
     bot = cast("Bot", event.app)
+    count("link_edit_events")
+    if not await _should_refresh(
+        "link_edit", event.guild_id, event.message_id
+    ):
+        return
+    if _is_unchanged(bot, event):
+        count("link_edit_unchanged")
+        return
+
     message = await get_orig_message(event.message_id)
     if not message:
+        count("link_edit_not_found")
         return
+    count("link_edit_refreshed")
     await refresh_message(bot, message, force=True)
 
 
@@ -51,7 +112,15 @@ async def on_message_edit(event: hikari.GuildMessageUpdateEvent) -> None:
 @crescent.event
 async def on_message_delete(event: hikari.GuildMessageDeleteEvent) -> None:
     bot = cast("Bot", event.app)
+    count("link_delete_events")
+    if not await _should_refresh(
+        "link_delete", event.guild_id, event.message_id
+    ):
+        return
+
     message = await get_orig_message(event.message_id)
     if not message:
+        count("link_delete_not_found")
         return
+    count("link_delete_refreshed")
     await refresh_message(bot, message, force=True)
@@ -27,6 +27,7 @@ import traceback
 from typing import TYPE_CHECKING
 
 from starboard.config import CONFIG
+from starboard.core.invalidation import BUS as INVALIDATION_BUS
 from starboard.stats import post_stats
 
 if TYPE_CHECKING:
@@ -62,7 +63,12 @@ async def loop_broadcast_stats(bot: Bot) -> None:
         await bot.cluster.ipc.send_event(
             bot.cluster.ipc.cluster_uids,
             "cluster_stats",
-            {"guild_count": len(bot.cache._guild_entries)},
+            {
+                "guild_count": len(bot.cache._guild_entries),
+                "cluster_id": bot.cluster.cluster_id,
+                "invalidation_version": INVALIDATION_BUS.version,
+                "invalidation_incarnation": INVALIDATION_BUS.incarnation,
+            },
         )
 
         await asyncio.sleep(CONFIG.broadcast_stats_delay)
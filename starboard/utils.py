@@ -39,6 +39,13 @@ def jump(guild: int, channel: int, message: int) -> str:
     return f"https://discord.com/channels/{guild}/{channel}/{message}"
 
 
+def owned(column: str = "guild_id") -> str:
+    """A filter for rows whose guild belongs to the shards in $2, out of $1
+    shards in total."""
+
+    return f"(({column}::bigint >> 22) % $1) = ANY($2::int[])"
+
+
 def get_guild(message: Message) -> Guild:
     bot = cast("Bot", message.app)
     if message.guild_id:
@@ -0,0 +1,158 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+import pytest
+
+from starboard.core.invalidation import InvalidationBus
+
+
+def _bus() -> tuple[InvalidationBus, list[set[int]], list[None]]:
+    bus = InvalidationBus()
+    drops: list[set[int]] = []
+    resets: list[None] = []
+    bus.register("k", drops.append, lambda: resets.append(None))
+    return bus, drops, resets
+
+
+def test_batches_in_order():
+    bus, drops, resets = _bus()
+    bus.receive(1, 1, {"k": [1, 2]}, incarnation="a")
+    bus.receive(1, 2, {"k": [3]}, incarnation="a")
+    bus.receive(1, 2, incarnation="a")
+
+    assert drops == [{1, 2}, {3}]
+    assert not resets
+
+
+def test_first_contact_is_a_baseline():
+    bus, _, resets = _bus()
+    bus.receive(1, 57, incarnation="a")
+    bus.receive(1, 58, {"k": [1]}, incarnation="a")
+
+    assert not resets
+
+
+def test_heartbeat_before_batch():
+    bus, drops, resets = _bus()
+    bus.receive(1, 5, incarnation="a")
+    bus.receive(1, 6, incarnation="a")
+    bus.receive(1, 6, {"k": [1]}, incarnation="a")
+
+    assert drops == [{1}]
+    assert not resets
+
+
+def test_lost_batch_resets_on_next_heartbeat():
+    bus, _, resets = _bus()
+    bus.receive(1, 5, incarnation="a")
+    bus.receive(1, 6, incarnation="a")
+    assert not resets
+
+    bus.receive(1, 6, incarnation="a")
+    assert len(resets) == 1
+
+
+def test_gap_in_batches_resets():
+    bus, drops, resets = _bus()
+    bus.receive(1, 1, {"k": [1]}, incarnation="a")
+    bus.receive(1, 3, {"k": [2]}, incarnation="a")
+
+    assert len(resets) == 1
+    # the batch itself is still applied
+    assert drops == [{1}, {2}]
+
+
+def test_heartbeat_gap_resets():
+    bus, _, resets = _bus()
+    bus.receive(1, 1, incarnation="a")
+    bus.receive(1, 3, incarnation="a")
+
+    assert len(resets) == 1
+
+
+def test_restart_does_not_reset():
+    bus, drops, resets = _bus()
+    bus.receive(1, 10, incarnation="a")
+    bus.receive(1, 0, incarnation="b")
+    bus.receive(1, 1, {"k": [1]}, incarnation="b")
+
+    assert drops == [{1}]
+    assert not resets
+
+
+def test_senders_are_tracked_separately():
+    bus, _, resets = _bus()
+    bus.receive(1, 1, {"k": [1]}, incarnation="a")
+    bus.receive(2, 1, {"k": [1]}, incarnation="b")
+    bus.receive(1, 2, {"k": [1]}, incarnation="a")
+
+    assert not resets
+
+
+def test_version_only_advances_after_a_send():
+    sent: list[dict[str, Any]] = []
+
+    async def no_peers(data: dict[str, Any]) -> bool:
+        return False
+
+    async def peers(data: dict[str, Any]) -> bool:
+        sent.append(data)
+        return True
+
+    async def main() -> None:
+        bus, _, _ = _bus()
+        bus.bind(0, no_peers)
+        bus.pending["k"] = {1}
+        await bus.flush()
+        assert bus.version == 0
+        assert not bus.pending
+
+        bus.bind(0, peers)
+        bus.pending["k"] = {1}
+        await bus.flush()
+        assert bus.version == 1
+        assert sent[0]["version"] == 1
+        assert sent[0]["incarnation"] == bus.incarnation
+
+    asyncio.run(main())
+
+
+def test_failed_send_keeps_keys():
+    async def fail(data: dict[str, Any]) -> bool:
+        raise ConnectionError
+
+    async def main() -> None:
+        bus, _, _ = _bus()
+        bus.bind(0, fail)
+        bus.pending["k"] = {1}
+        with pytest.raises(ConnectionError):
+            await bus.flush()
+
+        assert bus.version == 0
+        assert bus.pending == {"k": {1}}
+
+    asyncio.run(main())